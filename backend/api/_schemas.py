@@ -0,0 +1,23 @@
+"""Request models and SSE framing for the generation endpoints."""
+
+import json
+from pydantic import BaseModel
+from typing import Optional
+
+
+class GenerateProjectRequest(BaseModel):
+    level_id: int
+    tier: int
+    theme: Optional[str] = None
+    avoid_concepts: Optional[list[str]] = None
+
+
+class GenerateHintRequest(BaseModel):
+    instruction: str
+    code: str
+    error: Optional[str] = None
+
+
+def _sse(status: str, message: str, **extra) -> str:
+    payload = {"status": status, "message": message, **extra}
+    return f"data: {json.dumps(payload)}\n\n"
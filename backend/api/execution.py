@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
 from pydantic import BaseModel
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from backend.storage.database import get_session
+from backend.storage.database import Project, get_session
 from backend.services.execution_service import run_and_validate
 
 router = APIRouter(tags=["execution"])
@@ -16,12 +16,12 @@ class ExecuteRequest(BaseModel):
 
 
 @router.post("/execute")
-def execute_code(req: ExecuteRequest, session: Session = Depends(get_session)):
-    result = run_and_validate(
-        project_id=req.project_id,
+async def execute_code(req: ExecuteRequest, session: AsyncSession = Depends(get_session)):
+    project = await session.get(Project, req.project_id)
+    result = await run_and_validate(
+        project=project,
         step_num=req.step_num,
         code=req.code,
         accumulated_code=req.accumulated_code,
-        session=session,
     )
     return result
@@ -1,37 +1,41 @@
-import json
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from sqlmodel import Session, select
 
-from backend.storage.database import Lesson, get_session
+from backend.api.responses import RawJSON
+from backend.storage.database import Lesson, engine
 
 router = APIRouter(tags=["lessons"])
 
 
-@router.get("/lessons")
-def list_lessons(session: Session = Depends(get_session)):
-    lessons = session.exec(select(Lesson).order_by(Lesson.id)).all()
-    return [
-        {
-            "id": l.id,
-            "name": l.name,
-            "description": l.description,
-            "concepts": json.loads(l.concepts),
-            "prerequisite_id": l.prerequisite_id,
+def build_lessons_cache() -> dict[int, dict]:
+    """Load every lesson into response-ready dicts, keyed by lesson id.
+
+    Lessons are seeded once at startup and never change at runtime, so the
+    endpoints below serve from this cache instead of the database.
+    """
+    with Session(engine) as session:
+        lessons = session.exec(select(Lesson).order_by(Lesson.id)).all()
+        return {
+            l.id: {
+                "id": l.id,
+                "name": l.name,
+                "description": l.description,
+                "concepts": RawJSON(l.concepts),
+                "examples": RawJSON(l.examples),
+                "prerequisite_id": l.prerequisite_id,
+            }
+            for l in lessons
         }
-        for l in lessons
-    ]
+
+
+@router.get("/lessons")
+async def list_lessons(request: Request):
+    return request.app.state.lessons_list
 
 
 @router.get("/lessons/{lesson_id}")
-def get_lesson(lesson_id: int, session: Session = Depends(get_session)):
-    lesson = session.get(Lesson, lesson_id)
+async def get_lesson(lesson_id: int, request: Request):
+    lesson = request.app.state.lessons_cache.get(lesson_id)
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
-    return {
-        "id": lesson.id,
-        "name": lesson.name,
-        "description": lesson.description,
-        "concepts": json.loads(lesson.concepts),
-        "examples": json.loads(lesson.examples),
-        "prerequisite_id": lesson.prerequisite_id,
-    }
+    return lesson
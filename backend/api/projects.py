@@ -1,18 +1,20 @@
-import json
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 
+from backend.api.responses import RawJSON
+from backend.services.progress_service import completion_upsert
 from backend.storage.database import Project, Progress, get_session
 
 router = APIRouter(tags=["projects"])
 
 
 @router.get("/projects")
-def list_projects(
+async def list_projects(
     level: Optional[int] = Query(None),
     tier: Optional[int] = Query(None),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     stmt = select(Project)
     if level is not None:
@@ -21,7 +23,7 @@ def list_projects(
         stmt = stmt.where(Project.tier == tier)
     stmt = stmt.order_by(Project.level_id, Project.tier)
 
-    projects = session.exec(stmt).all()
+    projects = (await session.exec(stmt)).all()
     return [
         {
             "id": p.id,
@@ -29,7 +31,7 @@ def list_projects(
             "tier": p.tier,
             "name": p.name,
             "description": p.description,
-            "concepts_used": json.loads(p.concepts_used),
+            "concepts_used": RawJSON(p.concepts_used),
             "total_lines": p.total_lines,
             "difficulty_rating": p.difficulty_rating,
             "estimated_minutes": p.estimated_minutes,
@@ -39,8 +41,8 @@ def list_projects(
 
 
 @router.get("/projects/{project_id}")
-def get_project(project_id: str, session: Session = Depends(get_session)):
-    project = session.get(Project, project_id)
+async def get_project(project_id: str, session: AsyncSession = Depends(get_session)):
+    project = await session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
     return {
@@ -49,10 +51,10 @@ def get_project(project_id: str, session: Session = Depends(get_session)):
         "tier": project.tier,
         "name": project.name,
         "description": project.description,
-        "learning_goals": json.loads(project.learning_goals),
-        "concepts_used": json.loads(project.concepts_used),
+        "learning_goals": RawJSON(project.learning_goals),
+        "concepts_used": RawJSON(project.concepts_used),
         "total_lines": project.total_lines,
-        "steps": json.loads(project.steps),
+        "steps": RawJSON(project.steps),
         "full_solution": project.full_solution,
         "difficulty_rating": project.difficulty_rating,
         "estimated_minutes": project.estimated_minutes,
@@ -60,30 +62,30 @@ def get_project(project_id: str, session: Session = Depends(get_session)):
 
 
 @router.delete("/projects/{project_id}")
-def delete_project(project_id: str, session: Session = Depends(get_session)):
-    project = session.get(Project, project_id)
+async def delete_project(project_id: str, session: AsyncSession = Depends(get_session)):
+    project = await session.get(Project, project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
     # Delete associated progress records
-    progress_records = session.exec(
+    progress_records = (await session.exec(
         select(Progress).where(Progress.project_id == project_id)
-    ).all()
+    )).all()
     for p in progress_records:
-        session.delete(p)
+        await session.delete(p)
 
-    session.delete(project)
-    session.commit()
+    await session.delete(project)
+    await session.commit()
     return {"status": "ok"}
 
 
 @router.get("/progress")
-def get_progress(
-    user_id: str = "default", session: Session = Depends(get_session)
+async def get_progress(
+    user_id: str = "default", session: AsyncSession = Depends(get_session)
 ):
-    progress = session.exec(
+    progress = (await session.exec(
         select(Progress).where(Progress.user_id == user_id)
-    ).all()
+    )).all()
     return [
         {
             "project_id": p.project_id,
@@ -96,58 +98,39 @@ def get_progress(
 
 
 @router.post("/progress/complete")
-def mark_complete(
+async def mark_complete(
     data: dict,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     user_id = data.get("user_id", "default")
     project_id = data["project_id"]
     step_num = data["step_num"]
     code = data.get("code", "")
 
-    existing = session.exec(
-        select(Progress).where(
-            Progress.user_id == user_id,
-            Progress.project_id == project_id,
-            Progress.step_num == step_num,
-        )
-    ).first()
-
-    if existing:
-        existing.completed = True
-        existing.completed_at = __import__("datetime").datetime.utcnow().isoformat()
-        existing.code = code
-    else:
-        progress = Progress(
-            user_id=user_id,
-            project_id=project_id,
-            step_num=step_num,
-            completed=True,
-            completed_at=__import__("datetime").datetime.utcnow().isoformat(),
-            code=code,
-        )
-        session.add(progress)
+    await session.exec(
+        completion_upsert(user_id, project_id, [step_num], codes={step_num: code})
+    )
 
-    session.commit()
+    await session.commit()
     return {"status": "ok"}
 
 
 @router.delete("/progress/{project_id}")
-def reset_project_progress(
+async def reset_project_progress(
     project_id: str,
     user_id: str = Query("default"),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """Reset all progress for a specific project (allows restarting the project)."""
-    progress_records = session.exec(
+    progress_records = (await session.exec(
         select(Progress).where(
             Progress.project_id == project_id,
             Progress.user_id == user_id,
         )
-    ).all()
+    )).all()
 
     for p in progress_records:
-        session.delete(p)
+        await session.delete(p)
 
-    session.commit()
+    await session.commit()
     return {"status": "ok", "deleted_count": len(progress_records)}
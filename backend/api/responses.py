@@ -0,0 +1,35 @@
+"""JSON response class that splices pre-serialized JSON columns verbatim."""
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class RawJSON(str):
+    """A string that already holds serialized JSON (e.g. a JSON text column).
+
+    Emitted as-is by RawJSONResponse instead of being parsed and re-encoded.
+    """
+
+
+def _default(obj):
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.encode())
+    # OPT_PASSTHROUGH_SUBCLASS routes every subclass here, not just RawJSON
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, (list, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class RawJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS,
+        )
@@ -7,13 +7,17 @@ class Settings(BaseSettings):
     claude_api_key: str = ""
     claude_model: str = "claude-sonnet-4-5-20250929"
     claude_model_heavy: str = "claude-opus-4-6"
+    claude_hint_model: str = "claude-haiku-4-5-20251001"  # Short hints don't need a larger model
+    claude_rpm: int = 50  # Requests per minute generate_seeds.py budgets for (its --rpm default)
     sandbox_image: str = "mimo-sandbox:latest"
     sandbox_timeout: int = 10
     sandbox_memory_limit: str = "64m"
     sandbox_cpu_period: int = 100000
     sandbox_cpu_quota: int = 50000
+    sandbox_pool_size: int = 4  # Pre-warmed sandbox containers (0 disables the pool)
+    sandbox_worker_max_uses: int = 200  # Recycle a pooled container after this many runs
     data_dir: Path = Path("data")
-    host_project_root: str = "/app"  # Project root on host (for Docker volume mounts)
+    host_project_root: str = "/app"  # Unused since code is piped over stdin; kept so existing .env files load
     debug: bool = False
 
     model_config = {"env_prefix": "MIMO_", "env_file": ".env"}
@@ -0,0 +1,30 @@
+"""JSON encode/decode backed by orjson, with a stdlib fallback.
+
+Project JSON from Claude and sandbox results are parsed on every generation
+and execution; orjson does this several times faster than the stdlib.
+orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch
+the stdlib exception either way.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def loads(data: str | bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent: bool = False) -> str:
+    """Serialize to a str; indent=True matches json.dumps(indent=2)."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None)
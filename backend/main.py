@@ -1,14 +1,20 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from pathlib import Path
 
-from backend.storage.database import init_db, seed_lessons, seed_projects
-from backend.api.lessons import router as lessons_router
+from backend.api.responses import RawJSONResponse
+from backend.storage.database import async_engine, init_db, seed_lessons, seed_projects
+from backend.api.lessons import build_lessons_cache, router as lessons_router
 from backend.api.projects import router as projects_router
 from backend.api.execution import router as execution_router
 from backend.api.generation import router as generation_router
+from backend.services.claude_service import close_async_client
+from backend.services.hint_batcher import HintBatcher
+from backend.sandbox.pool import start_pool, stop_pool
+from backend.sandbox.prewarm import prewarm
 
 
 @asynccontextmanager
@@ -16,10 +22,32 @@ async def lifespan(app: FastAPI):
     init_db()
     seed_lessons()
     seed_projects()
+
+    # Lessons are write-once seed data — serve them from memory
+    lessons_cache = build_lessons_cache()
+    app.state.lessons_cache = lessons_cache
+    app.state.lessons_list = [
+        {k: v for k, v in lesson.items() if k != "examples"}
+        for lesson in lessons_cache.values()
+    ]
+    app.state.hint_batcher = HintBatcher()
+
+    # Containers take a moment to start; don't block the event loop on them
+    await asyncio.to_thread(prewarm)
+    await asyncio.to_thread(start_pool)
     yield
+    await asyncio.to_thread(stop_pool)
+    await close_async_client()
+    await async_engine.dispose()
 
 
-app = FastAPI(title="Mimo Clone", version="1.0.0", lifespan=lifespan)
+# orjson-backed responses everywhere; also splices RawJSON columns verbatim
+app = FastAPI(
+    title="Mimo Clone",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=RawJSONResponse,
+)
 
 # API routes
 app.include_router(lessons_router, prefix="/api/v1")
@@ -6,25 +6,38 @@ duplicating validation logic.
 
 import re
 
-from backend.sandbox.executor import execute_code
+from backend.sandbox.executor import execute_code_batch
 
 
 # ---------------------------------------------------------------------------
 # Constants
 # ---------------------------------------------------------------------------
 
-VAGUE_PATTERNS = [
-    re.compile(r"\bprint a message\b", re.IGNORECASE),
-    re.compile(r"\bprint a welcome\b", re.IGNORECASE),
-    re.compile(r"\bprint a greeting\b", re.IGNORECASE),
-    re.compile(r"\bstore the result\b(?!\s+in\s+a\s+variable\s+called)", re.IGNORECASE),
-    re.compile(r"\bstore it in a variable\b(?!\s+called)", re.IGNORECASE),
-    re.compile(r"\bcreate a variable\b(?!\s+called)", re.IGNORECASE),
-    re.compile(r"\bsave (?:it |the \w+ )?(?:in|to) a variable\b(?!\s+called)", re.IGNORECASE),
-    re.compile(r"\buse an? (?:appropriate|suitable|relevant)\b", re.IGNORECASE),
-    re.compile(r"\bprint an? (?:appropriate|suitable|relevant)\b", re.IGNORECASE),
+_VAGUE_SOURCES = [
+    r"\bprint a message\b",
+    r"\bprint a welcome\b",
+    r"\bprint a greeting\b",
+    r"\bstore the result\b(?!\s+in\s+a\s+variable\s+called)",
+    r"\bstore it in a variable\b(?!\s+called)",
+    r"\bcreate a variable\b(?!\s+called)",
+    r"\bsave (?:it |the \w+ )?(?:in|to) a variable\b(?!\s+called)",
+    r"\buse an? (?:appropriate|suitable|relevant)\b",
+    r"\bprint an? (?:appropriate|suitable|relevant)\b",
 ]
 
+VAGUE_PATTERNS = [re.compile(src, re.IGNORECASE) for src in _VAGUE_SOURCES]
+
+# All vague patterns as one alternation so each instruction is scanned once;
+# the named group (v0, v1, ...) identifies which pattern matched.
+VAGUE_RE = re.compile(
+    "|".join(f"(?P<v{i}>{src})" for i, src in enumerate(_VAGUE_SOURCES)),
+    re.IGNORECASE,
+)
+
+_SQ_RE = re.compile(r"'([^']*)'")
+_APOS_RE = re.compile(r"[a-zA-Z]'[a-zA-Z]")
+_INPUT_RE = re.compile(r"\binput\s*\(")
+
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -51,10 +64,7 @@ def fix_cumulative_solutions(project_data: dict):
         solution_lines = solution.split("\n")
 
         if len(solution_lines) > len(prev_solution_lines) and prev_solution_lines:
-            is_cumulative = all(
-                solution_lines[i] == prev_solution_lines[i]
-                for i in range(len(prev_solution_lines))
-            )
+            is_cumulative = solution_lines[:len(prev_solution_lines)] == prev_solution_lines
             if is_cumulative:
                 new_lines = solution_lines[len(prev_solution_lines):]
                 step["solution"] = "\n".join(new_lines)
@@ -66,22 +76,40 @@ def fix_cumulative_solutions(project_data: dict):
 # Quality validation
 # ---------------------------------------------------------------------------
 
-def validate_project_quality(project_data: dict) -> list[str]:
-    """Run quality checks on a generated project. Returns list of error messages."""
+def validate_project_quality(project_data: dict) -> tuple[list[str], dict | None]:
+    """Run quality checks on a generated project.
+
+    Returns (error messages, sandbox result of the last step). The last
+    step's accumulated program is the full solution, so callers can use that
+    result instead of executing full_solution again. It is None when the
+    project has no steps.
+    """
     errors = []
     steps = project_data.get("steps", [])
 
-    # 1. Step-by-step execution and output matching
-    accumulated_code = ""
+    # Build each step's accumulated program once; it drives both the
+    # execution check (1) and the mock inputs check (4).
+    scripts = []
+    mock_errors = []
+    parts = []
     for step in steps:
-        if accumulated_code:
-            accumulated_code += "\n" + step["solution"]
-        else:
-            accumulated_code = step["solution"]
-
+        parts.append(step["solution"])
+        accumulated_code = "\n".join(parts)
         mock_inputs = step.get("mock_inputs", [])
-        result = execute_code(accumulated_code, mock_inputs)
+        scripts.append((accumulated_code, mock_inputs))
+
+        input_count = len(_INPUT_RE.findall(accumulated_code))
+        mock_count = len(mock_inputs)
+        if input_count > 0 and mock_count < input_count:
+            mock_errors.append(
+                f"Step {step['step_num']}: {input_count} input() calls "
+                f"but only {mock_count} mock_inputs"
+            )
 
+    # 1. Step-by-step execution and output matching
+    # All accumulated programs run in a single sandbox invocation
+    results = execute_code_batch(scripts)
+    for step, (accumulated_code, _), result in zip(steps, scripts, results):
         if not result["success"]:
             errors.append(
                 f"Step {step['step_num']}: execution failed — "
@@ -106,38 +134,27 @@ def validate_project_quality(project_data: dict) -> list[str]:
     # 2. Instruction specificity
     for step in steps:
         instruction = step.get("instruction", "")
-        for pattern in VAGUE_PATTERNS:
-            match = pattern.search(instruction)
-            if match:
-                errors.append(
-                    f"Step {step['step_num']}: vague instruction — '{match.group()}'"
-                )
+        # Report the first match of each pattern, in pattern order
+        first_matches = {}
+        for match in VAGUE_RE.finditer(instruction):
+            first_matches.setdefault(int(match.lastgroup[1:]), match.group())
+        for _, text in sorted(first_matches.items()):
+            errors.append(
+                f"Step {step['step_num']}: vague instruction — '{text}'"
+            )
 
     # 3. Apostrophe in single-quoted strings
     for step in steps:
         solution = step.get("solution", "")
-        for sq_match in re.finditer(r"'([^']*)'", solution):
+        for sq_match in _SQ_RE.finditer(solution):
             content = sq_match.group(1)
-            if re.search(r"[a-zA-Z]'[a-zA-Z]", content):
+            if _APOS_RE.search(content):
                 errors.append(
                     f"Step {step['step_num']}: apostrophe in single-quoted string: "
                     f"{sq_match.group()}"
                 )
 
-    # 4. Mock inputs coverage
-    accumulated_code = ""
-    for step in steps:
-        if accumulated_code:
-            accumulated_code += "\n" + step["solution"]
-        else:
-            accumulated_code = step["solution"]
-
-        input_count = len(re.findall(r"\binput\s*\(", accumulated_code))
-        mock_count = len(step.get("mock_inputs", []))
-        if input_count > 0 and mock_count < input_count:
-            errors.append(
-                f"Step {step['step_num']}: {input_count} input() calls "
-                f"but only {mock_count} mock_inputs"
-            )
+    # 4. Mock inputs coverage (computed in the accumulate pass above)
+    errors.extend(mock_errors)
 
-    return errors
+    return errors, (results[-1] if results else None)
@@ -1,18 +1,25 @@
-import docker
-import tempfile
-import os
+import asyncio
+import json
+import re
+import socket
+import subprocess
+import threading
+import time
+from typing import TYPE_CHECKING
 
+from backend import jsonutil
 from backend.config import settings
+from backend.sandbox.pool import SANDBOX_TMPFS, PoolExhausted, get_pool, local_env
 
+# docker (and requests under it) is imported on first use so importing the
+# executor stays cheap and works where the SDK isn't installed
+if TYPE_CHECKING:
+    import docker
 
-def build_code_with_mocked_inputs(code: str, mock_inputs: list[str]) -> str:
-    """Wrap user code to mock input() calls with predefined values."""
-    if not mock_inputs:
-        return code
 
-    inputs_repr = repr(mock_inputs)
-    wrapper = f"""import builtins
-_mock_inputs = {inputs_repr}
+# input() mock installed ahead of the user's code; %s is the inputs list literal
+_WRAPPER_TMPL = """import builtins
+_mock_inputs = %s
 _input_index = 0
 
 def _mock_input(prompt=''):
@@ -28,7 +35,122 @@ def _mock_input(prompt=''):
 builtins.input = _mock_input
 
 """
-    return wrapper + code
+
+
+def _inputs_literal(mock_inputs: list[str]) -> str:
+    # A JSON array of strings is also a valid Python list literal, and much
+    # faster to produce than repr(); anything else goes through repr()
+    if all(isinstance(value, str) for value in mock_inputs):
+        try:
+            return jsonutil.dumps(mock_inputs)
+        except (TypeError, ValueError):
+            pass  # e.g. lone surrogates, which JSON can't encode
+    return repr(mock_inputs)
+
+
+def build_code_with_mocked_inputs(code: str, mock_inputs: list[str]) -> str:
+    """Wrap user code to mock input() calls with predefined values."""
+    if not mock_inputs:
+        return code
+
+    return _WRAPPER_TMPL % _inputs_literal(mock_inputs) + code
+
+
+# Random is seeded at interpreter start by a sitecustomize module: baked into
+# the sandbox image (see Dockerfile.sandbox) and put on PYTHONPATH for local
+# runs by pool.local_env(). The prelude is only needed for sandbox images
+# built before that.
+_SEED_PRELUDE = "import random; random.seed(42)\n"
+_SEEDED_IMAGE_LABEL = "mimo.random-seed"
+
+
+def _prepare_code(code: str, mock_inputs: list[str], seed_prelude: bool = False) -> str:
+    """Install the input() mock (and, if asked, the random seed) ahead of the user's code."""
+    if seed_prelude:
+        code = _SEED_PRELUDE + code
+    return build_code_with_mocked_inputs(code, mock_inputs)
+
+
+def _needs_seed_prelude() -> bool:
+    """True if runs will land on a sandbox image that doesn't seed random itself."""
+    return _get_docker() is not None and not _IMAGE_SEEDED
+
+
+# Driver run inside a single sandbox invocation by execute_code_batch. Each
+# program gets its own interpreter (so globals and input mocks don't leak) and
+# its result is written back as one JSON line.
+_BATCH_DRIVER = """import json
+import subprocess
+import sys
+
+for code in json.loads(%(payload)s):
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-"],
+            input=code,
+            capture_output=True,
+            text=True,
+            timeout=%(timeout)d,
+        )
+        item = {"success": proc.returncode == 0, "output": proc.stdout, "error": proc.stderr}
+    except subprocess.TimeoutExpired:
+        item = {"success": False, "output": "", "error": None}
+    print(json.dumps(item), flush=True)
+"""
+
+_TIMEOUT_MESSAGE = "Code execution timed out. Check for infinite loops."
+
+# Traceback cleanup: show the student's script as your_code.py (code arrives
+# on stdin; /code/script.py is the old bind-mount path) and hide the input()
+# mock's own frames
+_SCRIPT_PATH_RE = re.compile(r"/code/script\.py|<stdin>")
+_MOCK_LINE_RE = re.compile(r"^.*(?:_mock_input|_input_index).*\n?", re.MULTILINE)
+
+# Docker client and sandbox-image check, shared across calls. A failed check
+# is remembered for _DOCKER_RETRY_SECONDS so a later `docker build`/pull is
+# eventually picked up without re-probing on every execution.
+_DOCKER_CLIENT: "docker.DockerClient | None" = None
+_DOCKER_AVAILABLE: bool | None = None
+_DOCKER_CHECKED_AT = 0.0
+_DOCKER_RETRY_SECONDS = 60
+_IMAGE_SEEDED = False
+_docker_lock = threading.Lock()
+
+
+def _get_docker() -> "docker.DockerClient | None":
+    """Return the shared Docker client, or None if the sandbox image is unusable."""
+    global _DOCKER_CLIENT, _DOCKER_AVAILABLE, _DOCKER_CHECKED_AT, _IMAGE_SEEDED
+    with _docker_lock:
+        if _DOCKER_AVAILABLE:
+            return _DOCKER_CLIENT
+        if (
+            _DOCKER_AVAILABLE is False
+            and time.monotonic() - _DOCKER_CHECKED_AT < _DOCKER_RETRY_SECONDS
+        ):
+            return None
+
+        _DOCKER_CHECKED_AT = time.monotonic()
+        try:
+            import docker
+        except ImportError:
+            _DOCKER_AVAILABLE = False
+            return None
+        try:
+            client = docker.from_env()
+        except docker.errors.DockerException:
+            _DOCKER_AVAILABLE = False
+            return None
+        try:
+            image = client.images.get(settings.sandbox_image)
+        except (docker.errors.DockerException, docker.errors.ImageNotFound):
+            client.close()
+            _DOCKER_AVAILABLE = False
+            return None
+
+        _IMAGE_SEEDED = _SEEDED_IMAGE_LABEL in (image.labels or {})
+        _DOCKER_CLIENT = client
+        _DOCKER_AVAILABLE = True
+        return client
 
 
 def execute_code(code: str, mock_inputs: list[str] | None = None) -> dict:
@@ -36,80 +158,171 @@ def execute_code(code: str, mock_inputs: list[str] | None = None) -> dict:
     if mock_inputs is None:
         mock_inputs = []
 
-    # Seed random for deterministic output (projects using random module)
-    seeded_code = "import random; random.seed(42)\n" + code
-    wrapped_code = build_code_with_mocked_inputs(seeded_code, mock_inputs)
+    return _run_sandboxed(_prepare_code(code, mock_inputs, _needs_seed_prelude()))
+
+
+async def execute_code_async(code: str, mock_inputs: list[str] | None = None) -> dict:
+    """Async variant of execute_code for request handlers.
+
+    The local fallback runs as an asyncio subprocess; the Docker paths use the
+    blocking SDK, so they run in a worker thread.
+    """
+    if mock_inputs is None:
+        mock_inputs = []
+
+    if get_pool() is None and _get_docker() is None:
+        return await _execute_locally_async(_prepare_code(code, mock_inputs))
+    return await asyncio.to_thread(execute_code, code, mock_inputs)
+
+
+def execute_code_batch(scripts: list[tuple[str, list[str] | None]]) -> list[dict]:
+    """Execute several (code, mock_inputs) programs in one sandbox invocation.
+
+    Returns one {success, output, error} dict per script, in order. Paying the
+    container startup once instead of per program is what makes this worth it
+    for step-by-step project validation.
+    """
+    if not scripts:
+        return []
+
+    seed_prelude = _needs_seed_prelude()
+    payload = [
+        _prepare_code(code, mock_inputs or [], seed_prelude)
+        for code, mock_inputs in scripts
+    ]
+    driver = _BATCH_DRIVER % {
+        "payload": repr(json.dumps(payload)),
+        "timeout": settings.sandbox_timeout,
+    }
+    # Each program already has its own timeout inside the driver
+    result = _run_sandboxed(driver, timeout=settings.sandbox_timeout * len(scripts) + 5)
+    if not result["success"]:
+        return [dict(result) for _ in scripts]
+
+    results = []
+    for line in result["output"].splitlines():
+        try:
+            item = jsonutil.loads(line)
+        except jsonutil.JSONDecodeError:
+            continue
+        if item["success"]:
+            item["error"] = None
+        elif item["error"] is None:
+            item["error"] = _TIMEOUT_MESSAGE
+        else:
+            item["error"] = _clean_traceback(item["error"])
+        results.append(item)
+
+    # The driver died part-way through (e.g. memory limit) — fail the rest
+    while len(results) < len(scripts):
+        results.append({"success": False, "output": "", "error": "Sandbox execution was interrupted."})
+    return results
+
+
+def _run_sandboxed(wrapped_code: str, timeout: int | None = None) -> dict:
+    """Run already-prepared code in the Docker sandbox, or locally as a fallback."""
+    # Prefer a pre-warmed pool worker over starting a fresh container
+    pool = get_pool()
+    if pool is not None:
+        try:
+            item = pool.run(wrapped_code, timeout or settings.sandbox_timeout)
+        except PoolExhausted:
+            # Every worker is busy — pay for a one-off container instead
+            item = None
+        except TimeoutError:
+            # The worker missed its own deadline and has been replaced
+            return {"success": False, "output": "", "error": _TIMEOUT_MESSAGE}
+        except Exception as e:
+            return {"success": False, "output": "", "error": str(e)}
+    else:
+        item = None
+
+    if item is not None:
+        if item["timed_out"]:
+            return {"success": False, "output": "", "error": _TIMEOUT_MESSAGE}
+        if item["success"]:
+            return {"success": True, "output": item["output"], "error": None}
+        return {
+            "success": False,
+            "output": item["output"],
+            "error": _clean_traceback(item["error"]),
+        }
 
     # Try Docker sandbox first, fall back to local execution
-    try:
-        client = docker.from_env()
-        client.images.get(settings.sandbox_image)
-    except (docker.errors.DockerException, docker.errors.ImageNotFound):
-        return _execute_locally(wrapped_code)
-
-    # Write code to a temp file in /app/data (mounted volume) so Docker can access it
-    os.makedirs("/app/data/tmp", exist_ok=True)
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".py", delete=False, dir="/app/data/tmp"
-    ) as f:
-        f.write(wrapped_code)
-        code_path = f.name
-
-    # Make the file readable by the sandbox user
-    os.chmod(code_path, 0o644)
-
-    # Convert container path to host path for Docker volume mount
-    # /app/data inside container maps to <host_project_root>/data on host
-    # Docker requires absolute paths for volume mounts
-    host_data_dir = os.path.join(settings.host_project_root, "data")
-    host_path = code_path.replace("/app/data", host_data_dir)
+    client = _get_docker()
+    if client is None:
+        return _execute_locally(wrapped_code, timeout)
 
+    import requests
+
+    # Pipe the code to `python -` over the attached stdin — no temp file or
+    # bind mount needed. This goes through the low-level API client: the
+    # Container model wrappers cost an extra inspect round trip on create and
+    # aren't needed for a container that lives for one run. Creating with
+    # stdin_open and without detach also sets StdinOnce, so closing our end
+    # of stdin is the program's EOF.
+    api = client.api
+    container_id = None
     try:
-        result = client.containers.run(
+        container_id = api.create_container(
             settings.sandbox_image,
-            command=["python", "-u", "/code/script.py"],
-            volumes={host_path: {"bind": "/code/script.py", "mode": "ro"}},
+            command=["python", "-u", "-"],
+            stdin_open=True,
             network_disabled=True,
-            mem_limit=settings.sandbox_memory_limit,
-            cpu_period=settings.sandbox_cpu_period,
-            cpu_quota=settings.sandbox_cpu_quota,
-            remove=True,
-            stderr=True,
-            stdout=True,
-        )
+            host_config=api.create_host_config(
+                read_only=True,
+                tmpfs=SANDBOX_TMPFS,
+                mem_limit=settings.sandbox_memory_limit,
+                cpu_period=settings.sandbox_cpu_period,
+                cpu_quota=settings.sandbox_cpu_quota,
+            ),
+        )["Id"]
+        sock = api.attach_socket(container_id, params={"stdin": 1, "stream": 1})
+        api.start(container_id)
+        raw = getattr(sock, "_sock", sock)
+        raw.sendall(wrapped_code.encode("utf-8"))
+        raw.shutdown(socket.SHUT_WR)
+        sock.close()
 
-        output = result.decode("utf-8") if isinstance(result, bytes) else result
-        return {"success": True, "output": output, "error": None}
+        try:
+            status = api.wait(container_id, timeout=timeout or settings.sandbox_timeout)
+        except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError):
+            # wait() has a request timeout even though run() doesn't. The
+            # container may have exited since; remove_container below
+            # force-kills it either way.
+            try:
+                api.kill(container_id)
+            except Exception:
+                pass
+            return {"success": False, "output": "", "error": _TIMEOUT_MESSAGE}
 
-    except docker.errors.ContainerError as e:
-        stderr = e.stderr.decode("utf-8") if e.stderr else str(e)
+        stdout = api.logs(container_id, stdout=True, stderr=False).decode("utf-8")
+        if status["StatusCode"] == 0:
+            return {"success": True, "output": stdout, "error": None}
+        stderr = api.logs(container_id, stdout=False, stderr=True).decode("utf-8")
         return {"success": False, "output": "", "error": _clean_traceback(stderr)}
     except Exception as e:
+        # Includes create failures (missing image, daemon errors), which
+        # would otherwise surface as a 500 from /execute
         return {"success": False, "output": "", "error": str(e)}
     finally:
-        os.unlink(code_path)
+        if container_id is not None:
+            try:
+                api.remove_container(container_id, force=True)
+            except Exception:
+                pass
 
 
-def _execute_locally(code: str) -> dict:
+def _execute_locally(code: str, timeout: int | None = None) -> dict:
     """Fallback execution without Docker (for development)."""
-    import subprocess
-
-    # Create tmp directory if it doesn't exist
-    tmp_dir = os.path.join(os.getcwd(), "data", "tmp")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".py", delete=False, dir=tmp_dir
-    ) as f:
-        f.write(code)
-        code_path = f.name
-
     try:
         result = subprocess.run(
-            ["python3", code_path],
+            ["python3", "-"],
+            input=code,
             capture_output=True,
             text=True,
-            timeout=settings.sandbox_timeout,
+            timeout=timeout or settings.sandbox_timeout,
+            env=local_env(),
         )
 
         if result.returncode == 0:
@@ -124,20 +337,39 @@ def _execute_locally(code: str) -> dict:
         return {
             "success": False,
             "output": "",
-            "error": "Code execution timed out. Check for infinite loops.",
+            "error": _TIMEOUT_MESSAGE,
         }
-    finally:
-        os.unlink(code_path)
+
+
+async def _execute_locally_async(code: str) -> dict:
+    """_execute_locally without blocking the event loop."""
+    proc = await asyncio.create_subprocess_exec(
+        "python3", "-",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=local_env(),
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            proc.communicate(code.encode("utf-8")), timeout=settings.sandbox_timeout
+        )
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return {"success": False, "output": "", "error": _TIMEOUT_MESSAGE}
+
+    if proc.returncode == 0:
+        return {"success": True, "output": stdout.decode("utf-8"), "error": None}
+    return {
+        "success": False,
+        "output": stdout.decode("utf-8"),
+        "error": _clean_traceback(stderr.decode("utf-8")),
+    }
 
 
 def _clean_traceback(error: str) -> str:
     """Remove sandbox file paths from tracebacks to show cleaner errors."""
-    lines = error.strip().split("\n")
-    cleaned = []
-    for line in lines:
-        line = line.replace("/code/script.py", "your_code.py")
-        # Skip the mock input wrapper lines from traceback
-        if "_mock_input" in line or "_input_index" in line:
-            continue
-        cleaned.append(line)
-    return "\n".join(cleaned)
+    # Drop the mock input wrapper lines, then rename the script in one pass
+    cleaned = _MOCK_LINE_RE.sub("", error.strip())
+    return _SCRIPT_PATH_RE.sub("your_code.py", cleaned).rstrip("\n")
@@ -0,0 +1,537 @@
+"""Pool of long-lived sandbox workers.
+
+Starting a container per execution costs hundreds of milliseconds, which
+dominates the runtime of the small programs we validate. Each pooled
+container instead runs WORKER_SOURCE: a loop that reads length-prefixed JSON
+requests on stdin, runs the code in a forked child of the already-warm
+worker interpreter (so globals and input mocks never leak between runs, and
+no run pays for interpreter startup), and writes a length-prefixed JSON
+result to stdout. After each run the worker kills every process the run
+started and empties the scratch directories, so nothing carries over to
+the next user's run.
+
+Without Docker the same worker runs as a host subprocess, so local
+development skips the per-run interpreter startup too.
+"""
+
+import os
+import queue
+import select
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from backend import jsonutil
+from backend.config import settings
+
+# Imported on first use, like in executor.py
+if TYPE_CHECKING:
+    import docker
+
+
+WORKER_SOURCE = r"""
+import builtins
+import ctypes
+import json
+import os
+import select
+import shutil
+import signal
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+# Modules most projects import, loaded once here so forked runs start warm
+import math
+import random
+
+stdin = sys.stdin.buffer
+stdout = sys.stdout.buffer
+# Directories runs may write to, emptied after every run
+scratch_dirs = sys.argv[1:]
+
+# Become the reaper for orphaned descendants, so a double-forked or setsid'd
+# process from one run is reparented here and can be killed after it
+try:
+    libc = ctypes.CDLL(None)
+    libc.prctl(36, 1, 0, 0, 0)  # PR_SET_CHILD_SUBREAPER
+except (OSError, AttributeError):
+    libc = None
+
+
+def run_child(code, out, err):
+    # Own process group, so the run and what it spawns are killed together
+    os.setsid()
+    # Die with the worker if it is killed mid-run (e.g. by SandboxPool.close)
+    if libc is not None:
+        libc.prctl(1, signal.SIGKILL, 0, 0, 0)  # PR_SET_PDEATHSIG
+    os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+    os.dup2(out.fileno(), 1)
+    os.dup2(err.fileno(), 2)
+    sys.argv = ["-"]
+    # Forked from an interpreter that never drew from random, but reseed
+    # anyway so every run starts from the same state
+    random.seed(42)
+    status = 0
+    try:
+        namespace = {"__name__": "__main__", "__file__": "<stdin>", "__builtins__": builtins}
+        exec(compile(code, "<stdin>", "exec"), namespace)
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # Skip this worker's own frame, as a fresh `python -` would show
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next)
+        status = 1
+    for stream in (sys.stdout, sys.stderr):
+        try:
+            stream.flush()
+        except Exception:
+            pass
+    os._exit(status)
+
+
+def wait_for(pid, timeout):
+    # The deadline is enforced here rather than by an alarm in the child,
+    # which user code could ignore. Returns None if it passed.
+    deadline = time.monotonic() + timeout
+    try:
+        fd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        fd = None
+    try:
+        while True:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                return status
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if fd is not None:
+                select.select([fd], [], [], remaining)
+            else:
+                time.sleep(min(0.005, remaining))
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+def children():
+    me = os.getpid()
+    try:
+        with open(f"/proc/self/task/{me}/children") as f:
+            return [int(pid) for pid in f.read().split()]
+    except OSError:
+        pass
+    # Kernels without the children file: scan every process's parent
+    pids = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return pids
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == me:
+            pids.append(int(entry))
+    return pids
+
+
+def kill_run(pid):
+    # Kill the run's process group, then anything that left it; orphans
+    # reparent here as their parents die. False if something survived.
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    for _ in range(50):
+        pids = children()
+        if not pids:
+            return True
+        for stray in pids:
+            try:
+                os.kill(stray, signal.SIGKILL)
+            except OSError:
+                pass
+            try:
+                os.waitpid(stray, 0)
+            except ChildProcessError:
+                pass
+    return not children()
+
+
+def wipe_scratch():
+    clean = True
+    for directory in scratch_dirs:
+        try:
+            entries = os.listdir(directory)
+        except OSError:
+            continue
+        for name in entries:
+            path = os.path.join(directory, name)
+            try:
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.unlink(path)
+            except OSError:
+                clean = False
+    return clean
+
+
+def read_back(f):
+    f.seek(0)
+    return f.read().decode("utf-8", "replace")
+
+
+while True:
+    header = stdin.read(4)
+    if len(header) < 4:
+        break
+    request = json.loads(stdin.read(struct.unpack(">I", header)[0]))
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        pid = os.fork()
+        if pid == 0:
+            run_child(request["code"], out, err)
+        status = wait_for(pid, request["timeout"])
+        if status is None:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        # Nothing from this run may outlive it or leave files for the next;
+        # if that can't be guaranteed the host retires this worker
+        clean = kill_run(pid)
+        clean = wipe_scratch() and clean
+        if status is None:
+            result = {"success": False, "output": "", "error": "", "timed_out": True}
+        else:
+            result = {
+                "success": os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0,
+                "output": read_back(out),
+                "error": read_back(err),
+                "timed_out": False,
+            }
+        result["dirty"] = not clean
+    body = json.dumps(result).encode()
+    stdout.write(struct.pack(">I", len(body)) + body)
+    stdout.flush()
+"""
+
+# Sandbox containers run with a read-only root filesystem; the only writable
+# paths are these in-memory mounts, so incidental writes (scratch files,
+# programs that save to the working directory) never copy up into the
+# overlay layer. Shared with the one-off containers in executor.py.
+SANDBOX_TMPFS = {
+    "/tmp": "size=64m,mode=1777,noexec",
+    "/home/sandbox": "size=16m,mode=1777",
+    "/code": "size=16m,mode=1777",
+}
+
+# sitecustomize.py here seeds random the way the sandbox image does
+_LOCAL_SITE_DIR = os.path.join(os.path.dirname(__file__), "site")
+
+
+def local_env() -> dict:
+    """Environment for programs run on the host instead of in the sandbox.
+
+    Puts the seeding sitecustomize on PYTHONPATH. Anything those programs
+    spawn inherits it, including the batch driver's per-script interpreters.
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [_LOCAL_SITE_DIR, env.get("PYTHONPATH")])
+    )
+    return env
+
+
+# Extra seconds the host waits beyond the worker's own timeout before
+# declaring the container wedged and replacing it
+_GRACE_SECONDS = 5
+
+# How long a caller waits for an idle worker before falling back to a
+# one-off container
+_ACQUIRE_TIMEOUT = 0.5
+
+# How often the maintenance thread tops the pool back up to size
+_TOP_UP_INTERVAL = 30
+
+
+class PoolExhausted(Exception):
+    """No idle worker became available within _ACQUIRE_TIMEOUT."""
+
+
+class SandboxWorker:
+    """One long-lived sandbox container speaking the worker protocol."""
+
+    def __init__(self, client: "docker.DockerClient"):
+        self.container = client.containers.run(
+            settings.sandbox_image,
+            command=["python", "-u", "-c", WORKER_SOURCE, *SANDBOX_TMPFS],
+            stdin_open=True,
+            detach=True,
+            remove=True,
+            network_disabled=True,
+            read_only=True,
+            tmpfs=SANDBOX_TMPFS,
+            mem_limit=settings.sandbox_memory_limit,
+            cpu_period=settings.sandbox_cpu_period,
+            cpu_quota=settings.sandbox_cpu_quota,
+        )
+        attached = self.container.attach_socket(
+            params={"stdin": 1, "stdout": 1, "stream": 1}
+        )
+        # attach_socket returns a SocketIO wrapper; talk to the raw socket so
+        # reads honour settimeout()
+        self._attached = attached
+        self._sock = getattr(attached, "_sock", attached)
+        self._buffer = b""
+        self.uses = 0
+
+    def run(self, code: str, timeout: int) -> dict:
+        self.uses += 1
+        body = jsonutil.dumps({"code": code, "timeout": timeout}).encode()
+        self._sock.settimeout(timeout + _GRACE_SECONDS)
+        self._sock.sendall(struct.pack(">I", len(body)) + body)
+        size = struct.unpack(">I", self._read(4))[0]
+        return jsonutil.loads(self._read(size))
+
+    def kill(self):
+        try:
+            self._attached.close()
+            self.container.kill()
+        except Exception:
+            pass
+
+    def _read(self, n: int) -> bytes:
+        # Without a TTY, Docker multiplexes output: each chunk is prefixed by
+        # an 8-byte header of (stream type, payload length)
+        while len(self._buffer) < n:
+            stream, length = struct.unpack(">BxxxL", self._recv_exactly(8))
+            payload = self._recv_exactly(length)
+            if stream == 1:
+                self._buffer += payload
+        data, self._buffer = self._buffer[:n], self._buffer[n:]
+        return data
+
+    def _recv_exactly(self, n: int) -> bytes:
+        data = b""
+        while len(data) < n:
+            chunk = self._sock.recv(n - len(data))
+            if not chunk:
+                raise ConnectionError("Sandbox worker closed the connection")
+            data += chunk
+        return data
+
+
+class LocalWorker:
+    """WORKER_SOURCE in a host subprocess, for running without Docker.
+
+    Like the local fallback in executor.py this has no memory or network
+    limits; it only saves the interpreter startup. Runs start in a private
+    scratch directory (also their TMPDIR) that the worker empties after each.
+    """
+
+    def __init__(self):
+        self.scratch = tempfile.mkdtemp(prefix="mimo-sandbox-")
+        # The worker seeds its own forks; local_env() seeds interpreters they
+        # start, like execute_code_batch's driver children
+        env = local_env()
+        env["TMPDIR"] = self.scratch
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", "-c", WORKER_SOURCE, self.scratch],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=self.scratch,
+            env=env,
+        )
+        self.uses = 0
+
+    def run(self, code: str, timeout: int) -> dict:
+        self.uses += 1
+        body = jsonutil.dumps({"code": code, "timeout": timeout}).encode()
+        deadline = time.monotonic() + timeout + _GRACE_SECONDS
+        self.process.stdin.write(struct.pack(">I", len(body)) + body)
+        self.process.stdin.flush()
+        size = struct.unpack(">I", self._read(4, deadline))[0]
+        return jsonutil.loads(self._read(size, deadline))
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait()
+        except Exception:
+            pass
+        shutil.rmtree(self.scratch, ignore_errors=True)
+
+    def _read(self, n: int, deadline: float) -> bytes:
+        # Read the pipe directly rather than through the buffered file object,
+        # so select() sees everything that is still to come
+        fd = self.process.stdout.fileno()
+        data = b""
+        while len(data) < n:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError("Sandbox worker stopped responding")
+            chunk = os.read(fd, n - len(data))
+            if not chunk:
+                raise ConnectionError("Sandbox worker closed the connection")
+            data += chunk
+        return data
+
+
+class SandboxPool:
+    """Pool of idle workers, safe to share across threads.
+
+    Workers are SandboxWorkers on the given Docker client, or LocalWorkers
+    without one. They are recycled after settings.sandbox_worker_max_uses
+    runs so anything a program leaves behind doesn't accumulate, and a
+    background thread tops the pool back up if spawning failed. close()
+    stops every worker, including ones busy with a run.
+    """
+
+    def __init__(self, size: int, client: "docker.DockerClient | None" = None):
+        self.size = size
+        self._client = client
+        self._idle: queue.Queue[SandboxWorker | LocalWorker] = queue.Queue()
+        self._lock = threading.Lock()
+        # Every live worker, idle or busy; len() is the pool's current size
+        self._workers: set[SandboxWorker | LocalWorker] = set()
+        self._closed = threading.Event()
+        for _ in range(size):
+            self._spawn()
+        self._maintainer = threading.Thread(target=self._maintain, daemon=True)
+        self._maintainer.start()
+
+    def run(self, code: str, timeout: int) -> dict:
+        """Run prepared code on an idle worker, replacing it if it misbehaves.
+
+        Raises PoolExhausted if every worker stays busy past _ACQUIRE_TIMEOUT.
+        """
+        try:
+            worker = self._idle.get(timeout=_ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise PoolExhausted() from None
+
+        try:
+            result = worker.run(code, timeout)
+        except Exception:
+            self._retire(worker)
+            raise
+
+        # A dirty worker couldn't kill everything the run started or clear
+        # its scratch files, so it must not serve anyone else
+        if result.get("dirty") or worker.uses >= settings.sandbox_worker_max_uses:
+            self._retire(worker)
+        else:
+            with self._lock:
+                # close() already killed it if the pool shut down mid-run
+                if not self._closed.is_set():
+                    self._idle.put(worker)
+        return result
+
+    def close(self):
+        with self._lock:
+            self._closed.set()
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.kill()
+        if self._client is not None:
+            self._client.close()
+
+    def _retire(self, worker: SandboxWorker | LocalWorker):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+        self._spawn()
+
+    def _maintain(self):
+        while not self._closed.wait(_TOP_UP_INTERVAL):
+            while len(self._workers) < self.size and not self._closed.is_set():
+                if not self._spawn():
+                    break
+
+    def _spawn(self) -> bool:
+        if self._closed.is_set():
+            return False
+        try:
+            if self._client is not None:
+                worker = SandboxWorker(self._client)
+            else:
+                worker = LocalWorker()
+        except Exception as e:
+            print(f"[ERROR] Failed to start sandbox worker: {e}", file=sys.stderr)
+            return False
+        with self._lock:
+            # Starting a container is slow; the pool may have closed meanwhile
+            if not self._closed.is_set():
+                self._workers.add(worker)
+                self._idle.put(worker)
+                return True
+        worker.kill()
+        return False
+
+
+_pool: SandboxPool | None = None
+
+
+def start_pool():
+    """Start the shared pool on Docker, or on local workers if it's unavailable.
+
+    Leaves the pool unset when it is disabled, or when neither Docker nor
+    os.fork (which the worker needs) is available.
+    """
+    global _pool
+    if settings.sandbox_pool_size <= 0:
+        return
+    client = _docker_client()
+    if client is None and not hasattr(os, "fork"):
+        return
+    _pool = SandboxPool(settings.sandbox_pool_size, client)
+
+
+def _docker_client() -> "docker.DockerClient | None":
+    try:
+        import docker
+    except ImportError:
+        return None
+    try:
+        client = docker.from_env()
+    except docker.errors.DockerException:
+        return None
+    try:
+        client.images.get(settings.sandbox_image)
+    except (docker.errors.DockerException, docker.errors.ImageNotFound):
+        client.close()
+        return None
+    return client
+
+
+def stop_pool():
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+def get_pool() -> SandboxPool | None:
+    return _pool
@@ -0,0 +1,45 @@
+"""Warm the sandbox image before the first request needs it.
+
+Without this, the first execution pays for fetching the image and for a cold
+interpreter start inside a fresh container.
+"""
+
+import sys
+
+from backend.config import settings
+
+
+def prewarm():
+    """Make sure the sandbox image is present and run one throwaway container.
+
+    Failures are logged and otherwise ignored — execution falls back to the
+    local subprocess path when Docker isn't usable.
+    """
+    try:
+        import docker
+    except ImportError:
+        return
+    try:
+        client = docker.from_env()
+    except docker.errors.DockerException:
+        return
+
+    try:
+        try:
+            client.images.get(settings.sandbox_image)
+        except docker.errors.ImageNotFound:
+            # Locally built images (mimo-sandbox:latest) won't be in a
+            # registry; the pull only helps for a published image
+            client.images.pull(settings.sandbox_image)
+
+        client.containers.run(
+            settings.sandbox_image,
+            command=["python", "-c", "import json, math, random, sys"],
+            network_disabled=True,
+            mem_limit=settings.sandbox_memory_limit,
+            remove=True,
+        )
+    except docker.errors.DockerException as e:
+        print(f"[WARN] Sandbox prewarm skipped: {e}", file=sys.stderr)
+    finally:
+        client.close()
@@ -0,0 +1,4 @@
+# Seed random for deterministic output (projects using random module).
+# The sandbox image installs the same line as its sitecustomize; the local
+# fallback puts this directory on PYTHONPATH so both seed identically.
+import random; random.seed(42)
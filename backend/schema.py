@@ -0,0 +1,81 @@
+"""Schema for the project JSON Claude returns, checked while decoding.
+
+With msgspec installed, decode_project() parses and validates in one C-level
+pass, so a project missing fields or with mistyped values is rejected before
+it reaches validation or the repair loop. Without it, the JSON is parsed
+with jsonutil and only checked for required keys.
+"""
+
+from typing import NotRequired, TypedDict
+
+from backend import jsonutil
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec is in requirements.txt
+    msgspec = None
+
+
+class StepJSON(TypedDict):
+    step_num: int
+    instruction: str
+    solution: str
+    hint: NotRequired[str]
+    expected_lines: NotRequired[int]
+    expected_output: NotRequired[str]
+    mock_inputs: NotRequired[list[str]]
+    starter_code: NotRequired[str]
+
+
+class ProjectJSON(TypedDict):
+    id: str
+    level_id: int
+    tier: int
+    name: str
+    description: str
+    learning_goals: list[str]
+    concepts_used: list[str]
+    total_lines: int
+    steps: list[StepJSON]
+    full_solution: str
+    difficulty_rating: NotRequired[int]
+    estimated_minutes: NotRequired[int]
+    is_generated: NotRequired[bool]
+
+
+class ProjectSchemaError(ValueError):
+    """The JSON parsed but doesn't have the shape of a project."""
+
+
+if msgspec is not None:
+    _decoder = msgspec.json.Decoder(ProjectJSON)
+    # DecodeError covers malformed JSON and, via ValidationError, bad shapes
+    DecodeErrors = (msgspec.DecodeError, ProjectSchemaError)
+else:
+    _decoder = None
+    DecodeErrors = (jsonutil.JSONDecodeError, ProjectSchemaError)
+
+
+def decode_project(text: str | bytes) -> ProjectJSON:
+    """Parse and validate project JSON, returning a plain dict.
+
+    Raises one of DecodeErrors if the text is not valid JSON or not a project.
+    """
+    if _decoder is not None:
+        return _decoder.decode(text)
+
+    data = jsonutil.loads(text)
+    _check_keys(data, ProjectJSON, "project")
+    if not isinstance(data["steps"], list):
+        raise ProjectSchemaError("steps must be a list")
+    for i, step in enumerate(data["steps"]):
+        _check_keys(step, StepJSON, f"step {i}")
+    return data
+
+
+def _check_keys(data, schema: type, label: str):
+    if not isinstance(data, dict):
+        raise ProjectSchemaError(f"Expected an object for {label}")
+    missing = schema.__required_keys__ - data.keys()
+    if missing:
+        raise ProjectSchemaError(f"{label} is missing {', '.join(sorted(missing))}")
@@ -1,123 +1,32 @@
-import json
-from anthropic import Anthropic
+import re
+from typing import TYPE_CHECKING, Iterator
 
+from backend import jsonutil
 from backend.config import settings
+from backend.schema import DecodeErrors, decode_project
 
+# anthropic pulls in httpx and pydantic models; it is imported when the first
+# client is built so importing this module (and app startup) stays cheap
+if TYPE_CHECKING:
+    from anthropic import Anthropic, AsyncAnthropic
 
+
+# max_tokens caps the project JSON (generation and repair) at roughly 1.5x the
+# largest seed project of that tier, so runaway output is cut off early
+# without truncating real projects. Capstones need the most room.
 TIER_SPECS = {
-    1: {"lines": "15-20", "steps": "4-6", "desc": "basic, focused on single concepts"},
-    2: {"lines": "20-30", "steps": "6-8", "desc": "intermediate, combining 2-3 concepts"},
-    3: {"lines": "30-70", "steps": "8-15", "desc": "capstone, integrating multiple levels"},
+    1: {"lines": "15-20", "steps": "4-6", "desc": "basic, focused on single concepts", "max_tokens": 3072},
+    2: {"lines": "20-30", "steps": "6-8", "desc": "intermediate, combining 2-3 concepts", "max_tokens": 4096},
+    3: {"lines": "30-70", "steps": "8-15", "desc": "capstone, integrating multiple levels", "max_tokens": 6000},
 }
 
 
-def _model_for_tier(tier: int) -> str:
-    """Route to Opus for capstone (tier 3), Sonnet for basic/intermediate."""
-    if tier >= 3 and settings.claude_model_heavy:
-        return settings.claude_model_heavy
-    return settings.claude_model
-
-
-def generate_project(
-    level_id: int,
-    tier: int,
-    concepts: list[str],
-    generation_context: str = "",
-    theme: str | None = None,
-    avoid_concepts: list[str] | None = None,
-) -> dict | None:
-    """Generate a project using Claude API."""
-    if not settings.claude_api_key:
-        return None
-
-    spec = TIER_SPECS.get(tier, TIER_SPECS[1])
-    avoid_str = ", ".join(avoid_concepts) if avoid_concepts else "none"
-
-    # Add tier-specific concept requirements based on actual Mimo curriculum
-    tier_requirements = ""
-    if level_id == 1:
-        # Level 1 Mimo progression: Variables (01-02) → Booleans/Comparisons (03-04) → Formatting (05) → Bot Part 1 (07) → More Comparisons (08-09) → Types (10) → Input (12) → Bot Part 2 (13)
-        if tier == 1:
-            # Basic: Core fundamentals (lessons 1-6 focus)
-            tier_requirements = "\n- MUST use: Variables, print(), input(), string concatenation OR f-strings, at least one comparison (==, !=, <, >)"
-            tier_requirements += "\n- Focus on: Getting user input, storing in variables, displaying output with basic formatting"
-            tier_requirements += "\n- Keep it simple: 3-4 core concepts combined"
-        elif tier == 2:
-            # Intermediate: More concepts combined (lessons 1-11)
-            tier_requirements = "\n- MUST use: Variables, print(), input() with type conversion (int(input()) or float(input())), f-strings, multiple comparisons, basic arithmetic"
-            tier_requirements += "\n- Should demonstrate: Working with different data types (strings, integers, floats), converting user input"
-            tier_requirements += "\n- Focus on: Combining 5-6 concepts in a practical way"
-        elif tier == 3:
-            # Capstone: Full level (all lessons 1-13)
-            tier_requirements = "\n- MUST use: Variables (multiple), print(), input() with conversions, f-strings, comparisons (multiple types), type() function or explicit type awareness, booleans"
-            tier_requirements += "\n- Should include: Multiple data types (str, int, float, bool), type conversions, formatted output, user interaction"
-            tier_requirements += "\n- Focus on: Building a complete interactive program using all Level 1 concepts"
-    elif level_id == 2:
-        # Level 2 Mimo progression: Conditionals (01-07) → Rock Paper Scissors Part 1 (08) → Loops (09-17) → Rock Paper Scissors Part 2 (18)
-        if tier == 1:
-            # Basic: Conditionals focus (lessons 1-8)
-            tier_requirements = "\n- MUST use: if/elif/else statements, comparison operators (==, !=, <, >, <=, >=), at least 2-3 conditional branches"
-            tier_requirements += "\n- MAY use: Simple while or for loop if appropriate, but conditionals are the focus"
-            tier_requirements += "\n- Focus on: Decision-making logic with multiple outcomes based on user input or conditions"
-        elif tier == 2:
-            # Intermediate: Conditionals + Basic Loops (lessons 1-13)
-            tier_requirements = "\n- MUST use: if/elif/else with logical operators (and/or/not), nested if statements OR nested loops, while loops with counter/accumulator patterns, shorthand operators (+=, -=)"
-            tier_requirements += "\n- Should demonstrate: Combining conditions, loop control with counters, break or continue statements"
-            tier_requirements += "\n- Focus on: Programs that make complex decisions AND repeat actions (score trackers, menu systems, counting tasks)"
-        elif tier == 3:
-            # Capstone: Full level (all lessons 1-18)
-            tier_requirements = "\n- MUST use: Complex nested conditionals, logical operators, BOTH while and for loops, break/continue, shorthand operators, range() with parameters"
-            tier_requirements += "\n- Should include: Menu-driven system with loop-until-exit pattern, nested loops or nested conditionals, accumulation/counting across multiple iterations"
-            tier_requirements += "\n- Focus on: Complete interactive programs like games with replay, menu systems, or multi-step processes that combine all flow control concepts"
-    elif level_id == 3:
-        # Level 3 Mimo progression: Basic list ops (01-03) → Looping/Membership (05-06) → ToDo Part 1 (08) → Data analysis (09-11) → Joining/Counting (13-14) → ToDo Part 2 (16)
-        if tier == 1:
-            # Basic: Core list operations (lessons 1-8 focus)
-            tier_requirements = "\n- MUST use: List creation, indexing, slicing, at least 2 of: append/insert/remove/pop, for loop to iterate over list"
-            tier_requirements += "\n- Focus on: Building and modifying lists, accessing elements by position, simple list iteration"
-            tier_requirements += "\n- Keep it simple: 3-4 list operations combined in a practical scenario"
-        elif tier == 2:
-            # Intermediate: List operations + data analysis (lessons 1-13)
-            tier_requirements = "\n- MUST use: List creation/modification, slicing, for loops, membership testing with 'in', at least one of: min()/max()/sum(), .sort() or list concatenation with +, .join() to format list output"
-            tier_requirements += "\n- MAY use: .index() to find element positions"
-            tier_requirements += "\n- Should demonstrate: Processing list data, finding information in lists, combining multiple lists or sorting data, displaying formatted list output"
-            tier_requirements += "\n- Focus on: Programs that build lists AND analyze or process the data (e.g., finding highest/lowest, totaling values, organizing data)"
-        elif tier == 3:
-            # Capstone: Full level (all lessons 1-16)
-            tier_requirements = "\n- MUST use: List creation, multiple modification methods (append/insert/remove/pop), slicing, for loops, membership testing with 'in', data analysis (at least 2 of: min/max/sum/sort), len(), list concatenation, .join() for formatted output"
-            tier_requirements += "\n- Should include: Interactive menu system with loop-until-exit pattern, dynamic list building based on user input, list operations combined with conditionals, formatted list display"
-            tier_requirements += "\n- Focus on: Complete interactive programs like ToDo lists, inventory managers, or data processors that combine all list operations in a cohesive application"
-    elif level_id == 6:
-        # Level 6 Mimo progression: Modules & Aliases (01-02) → Exceptions (03-05) → APIs/Requests (06-09)
-        if tier == 1:
-            # Basic: Lessons 01-02 (Modules basics, import syntax, aliases)
-            tier_requirements = "\n- MUST use: import statement (import random, import json, or import math), 1-2 module functions"
-            tier_requirements += "\n- MAY use: from...import syntax or import...as aliases"
-            tier_requirements += "\n- Focus on: Understanding what modules are, basic import syntax, and how to call module functions"
-        elif tier == 2:
-            # Intermediate: Lessons 01-05 (Modules + Basic Error Handling)
-            tier_requirements = "\n- MUST use: import AND from...import syntax, ONE complete try/except block (4 lines: try, operation, except Type, handle)"
-            tier_requirements += "\n- MAY use: import...as aliases, multiple modules (e.g., random + json)"
-            tier_requirements += "\n- The try/except block MUST be in a single step, not split across steps"
-            tier_requirements += "\n- Focus on: Using modules effectively with basic error handling for common errors (ValueError for int() conversion, KeyError for dict access, etc.)"
-            tier_requirements += "\n- Keep it simple: demonstrate the concept without overly complex exception handling"
-        elif tier == 3:
-            # Capstone: All lessons (Modules + Exceptions + simulated API workflow with requests)
-            tier_requirements = "\n- MUST use: import, from...import, and import...as; try/except/else/finally with multiple specific exception types; simulated requests.get() workflow with response object pattern"
-            tier_requirements += "\n- MUST use: raise to handle invalid input/data; json.loads() or response.json() pattern to parse data; exception handling for missing keys, invalid values, etc."
-            tier_requirements += "\n- Should include: Simulate API response as dict with .json() method or use json.loads() on JSON string; check response.status_code pattern; handle KeyError/ValueError/TypeError for missing/invalid data; multiple modules working together (random for simulation, json for parsing, etc.)"
-            tier_requirements += "\n- Focus on: Complete API workflow simulation - make simulated request, check status, parse JSON response, handle errors gracefully, process results"
-            tier_requirements += "\n- NOTE: Network is disabled in sandbox. Simulate API responses with predefined dicts or JSON strings. Show requests.get() pattern but use mock data."
-
-    context_section = f"\n\nLEVEL CONTEXT:\n{generation_context}" if generation_context else ""
-
-    prompt = f"""Generate a Python learning project for a Mimo-like learning app.
+_EPHEMERAL = {"type": "ephemeral"}
 
-LEVEL: {level_id} - Concepts: {', '.join(concepts)}
-TIER: {tier} ({spec['desc']})
-TARGET: {spec['lines']} lines of code, {spec['steps']} steps
-THEME: {theme or 'any practical, engaging topic'}
-AVOID: {avoid_str}{tier_requirements}{context_section}
+# Static generation rules, sent as a cached system block. Must stay
+# byte-identical across calls so Anthropic prompt caching can reuse it for
+# back-to-back generations and the repair loop.
+_PROJECT_RULES = """You generate Python learning projects for a Mimo-like learning app. Each request gives you a LEVEL, TIER and TARGET; use that level and tier in the returned JSON.
 
 PROJECT QUALITY GUIDELINES:
 
@@ -218,10 +127,10 @@ Step 5:
   solution: "print(f'Age: {age}')"  # This code doesn't need to be in the try block
 
 Return ONLY valid JSON with this exact structure (no markdown, no explanation):
-{{
-  "id": "level{level_id}_tier{tier}_<shortname>",
-  "level_id": {level_id},
-  "tier": {tier},
+{
+  "id": "level<LEVEL>_tier<TIER>_<shortname>",
+  "level_id": <LEVEL>,
+  "tier": <TIER>,
   "name": "<project name>",
   "description": "<what we're building and why>",
   "learning_goals": ["<goal1>", "<goal2>", ...],
@@ -230,7 +139,7 @@ Return ONLY valid JSON with this exact structure (no markdown, no explanation):
   "difficulty_rating": <1-5>,
   "estimated_minutes": <number>,
   "steps": [
-    {{
+    {
       "step_num": 1,
       "instruction": "<clear instruction>",
       "hint": "<helpful hint>",
@@ -239,39 +148,375 @@ Return ONLY valid JSON with this exact structure (no markdown, no explanation):
       "mock_inputs": ["<input1>", ...],
       "starter_code": "",
       "solution": "<ONLY the new code for this step, NOT cumulative>"
-    }}
+    }
   ],
   "full_solution": "<complete working code>"
-}}"""
+}"""
+
+_SYSTEM_BLOCKS = [{"type": "text", "text": _PROJECT_RULES, "cache_control": _EPHEMERAL}]
+
+# Static repair rules, cached after the generation rules so repair calls
+# reuse both prefixes.
+_REPAIR_RULES = """When asked to repair a project, keep the same project ID, name, structure, and number of steps. Do not add or remove steps.
+
+Rules for fixes:
+- If an instruction is "vague", rewrite it to specify the EXACT text for print()/input() and EXACT variable names. Look at the step's solution to determine what the instruction should say.
+- If there's an apostrophe in a single-quoted string, change the outer quotes to double quotes.
+- If mock_inputs count is wrong, provide the correct number of mock inputs for all input() calls in the accumulated code up to that step.
+- If there's an output mismatch, update expected_output to match what the accumulated code actually produces. Remember: all code runs with "import random; random.seed(42)" prepended, so random module output is deterministic.
+- If there's an execution failure with SyntaxError about "expected 'except'", it means a try: block was started but not completed before other code was added. Fix by moving the try/except block into a single step OR restructuring so the except: block completes before any other code.
+- If there's an execution failure, fix the code in the solution field.
+- Each step's "solution" must contain ONLY the new code for that step (not cumulative).
+- The "expected_output" for each step must be the COMPLETE output of running ALL accumulated code up to that step.
+
+Return ONLY the corrected JSON (no markdown fences, no explanation)."""
+
+_REPAIR_SYSTEM_BLOCKS = _SYSTEM_BLOCKS + [
+    {"type": "text", "text": _REPAIR_RULES, "cache_control": _EPHEMERAL},
+]
+
+
+def _log_cache_usage(label: str, usage) -> None:
+    """Report prompt-cache hits so the cache_control breakpoints can be verified."""
+    if settings.debug:
+        import sys
+        print(
+            f"[DEBUG] {label}: input={usage.input_tokens} "
+            f"cache_read={usage.cache_read_input_tokens or 0} "
+            f"cache_write={usage.cache_creation_input_tokens or 0}",
+            file=sys.stderr,
+        )
+
+
+def _model_for_tier(tier: int) -> str:
+    """Route to Opus for capstone (tier 3), Sonnet for basic/intermediate."""
+    if tier >= 3 and settings.claude_model_heavy:
+        return settings.claude_model_heavy
+    return settings.claude_model
+
+
+def _max_tokens_for_tier(tier: int) -> int:
+    return TIER_SPECS.get(min(tier, 3), TIER_SPECS[1])["max_tokens"]
+
+
+# Tier-specific concept requirements based on actual Mimo curriculum,
+# keyed by (level_id, tier). Levels without an entry get none.
+_TIER_REQUIREMENTS = {
+    # Level 1 Mimo progression: Variables (01-02) → Booleans/Comparisons (03-04) → Formatting (05) → Bot Part 1 (07) → More Comparisons (08-09) → Types (10) → Input (12) → Bot Part 2 (13)
+    # Basic: Core fundamentals (lessons 1-6 focus)
+    (1, 1): (
+        "\n- MUST use: Variables, print(), input(), string concatenation OR f-strings, at least one comparison (==, !=, <, >)"
+        "\n- Focus on: Getting user input, storing in variables, displaying output with basic formatting"
+        "\n- Keep it simple: 3-4 core concepts combined"
+    ),
+    # Intermediate: More concepts combined (lessons 1-11)
+    (1, 2): (
+        "\n- MUST use: Variables, print(), input() with type conversion (int(input()) or float(input())), f-strings, multiple comparisons, basic arithmetic"
+        "\n- Should demonstrate: Working with different data types (strings, integers, floats), converting user input"
+        "\n- Focus on: Combining 5-6 concepts in a practical way"
+    ),
+    # Capstone: Full level (all lessons 1-13)
+    (1, 3): (
+        "\n- MUST use: Variables (multiple), print(), input() with conversions, f-strings, comparisons (multiple types), type() function or explicit type awareness, booleans"
+        "\n- Should include: Multiple data types (str, int, float, bool), type conversions, formatted output, user interaction"
+        "\n- Focus on: Building a complete interactive program using all Level 1 concepts"
+    ),
+
+    # Level 2 Mimo progression: Conditionals (01-07) → Rock Paper Scissors Part 1 (08) → Loops (09-17) → Rock Paper Scissors Part 2 (18)
+    # Basic: Conditionals focus (lessons 1-8)
+    (2, 1): (
+        "\n- MUST use: if/elif/else statements, comparison operators (==, !=, <, >, <=, >=), at least 2-3 conditional branches"
+        "\n- MAY use: Simple while or for loop if appropriate, but conditionals are the focus"
+        "\n- Focus on: Decision-making logic with multiple outcomes based on user input or conditions"
+    ),
+    # Intermediate: Conditionals + Basic Loops (lessons 1-13)
+    (2, 2): (
+        "\n- MUST use: if/elif/else with logical operators (and/or/not), nested if statements OR nested loops, while loops with counter/accumulator patterns, shorthand operators (+=, -=)"
+        "\n- Should demonstrate: Combining conditions, loop control with counters, break or continue statements"
+        "\n- Focus on: Programs that make complex decisions AND repeat actions (score trackers, menu systems, counting tasks)"
+    ),
+    # Capstone: Full level (all lessons 1-18)
+    (2, 3): (
+        "\n- MUST use: Complex nested conditionals, logical operators, BOTH while and for loops, break/continue, shorthand operators, range() with parameters"
+        "\n- Should include: Menu-driven system with loop-until-exit pattern, nested loops or nested conditionals, accumulation/counting across multiple iterations"
+        "\n- Focus on: Complete interactive programs like games with replay, menu systems, or multi-step processes that combine all flow control concepts"
+    ),
+
+    # Level 3 Mimo progression: Basic list ops (01-03) → Looping/Membership (05-06) → ToDo Part 1 (08) → Data analysis (09-11) → Joining/Counting (13-14) → ToDo Part 2 (16)
+    # Basic: Core list operations (lessons 1-8 focus)
+    (3, 1): (
+        "\n- MUST use: List creation, indexing, slicing, at least 2 of: append/insert/remove/pop, for loop to iterate over list"
+        "\n- Focus on: Building and modifying lists, accessing elements by position, simple list iteration"
+        "\n- Keep it simple: 3-4 list operations combined in a practical scenario"
+    ),
+    # Intermediate: List operations + data analysis (lessons 1-13)
+    (3, 2): (
+        "\n- MUST use: List creation/modification, slicing, for loops, membership testing with 'in', at least one of: min()/max()/sum(), .sort() or list concatenation with +, .join() to format list output"
+        "\n- MAY use: .index() to find element positions"
+        "\n- Should demonstrate: Processing list data, finding information in lists, combining multiple lists or sorting data, displaying formatted list output"
+        "\n- Focus on: Programs that build lists AND analyze or process the data (e.g., finding highest/lowest, totaling values, organizing data)"
+    ),
+    # Capstone: Full level (all lessons 1-16)
+    (3, 3): (
+        "\n- MUST use: List creation, multiple modification methods (append/insert/remove/pop), slicing, for loops, membership testing with 'in', data analysis (at least 2 of: min/max/sum/sort), len(), list concatenation, .join() for formatted output"
+        "\n- Should include: Interactive menu system with loop-until-exit pattern, dynamic list building based on user input, list operations combined with conditionals, formatted list display"
+        "\n- Focus on: Complete interactive programs like ToDo lists, inventory managers, or data processors that combine all list operations in a cohesive application"
+    ),
+
+    # Level 6 Mimo progression: Modules & Aliases (01-02) → Exceptions (03-05) → APIs/Requests (06-09)
+    # Basic: Lessons 01-02 (Modules basics, import syntax, aliases)
+    (6, 1): (
+        "\n- MUST use: import statement (import random, import json, or import math), 1-2 module functions"
+        "\n- MAY use: from...import syntax or import...as aliases"
+        "\n- Focus on: Understanding what modules are, basic import syntax, and how to call module functions"
+    ),
+    # Intermediate: Lessons 01-05 (Modules + Basic Error Handling)
+    (6, 2): (
+        "\n- MUST use: import AND from...import syntax, ONE complete try/except block (4 lines: try, operation, except Type, handle)"
+        "\n- MAY use: import...as aliases, multiple modules (e.g., random + json)"
+        "\n- The try/except block MUST be in a single step, not split across steps"
+        "\n- Focus on: Using modules effectively with basic error handling for common errors (ValueError for int() conversion, KeyError for dict access, etc.)"
+        "\n- Keep it simple: demonstrate the concept without overly complex exception handling"
+    ),
+    # Capstone: All lessons (Modules + Exceptions + simulated API workflow with requests)
+    (6, 3): (
+        "\n- MUST use: import, from...import, and import...as; try/except/else/finally with multiple specific exception types; simulated requests.get() workflow with response object pattern"
+        "\n- MUST use: raise to handle invalid input/data; json.loads() or response.json() pattern to parse data; exception handling for missing keys, invalid values, etc."
+        "\n- Should include: Simulate API response as dict with .json() method or use json.loads() on JSON string; check response.status_code pattern; handle KeyError/ValueError/TypeError for missing/invalid data; multiple modules working together (random for simulation, json for parsing, etc.)"
+        "\n- Focus on: Complete API workflow simulation - make simulated request, check status, parse JSON response, handle errors gracefully, process results"
+        "\n- NOTE: Network is disabled in sandbox. Simulate API responses with predefined dicts or JSON strings. Show requests.get() pattern but use mock data."
+    ),
+}
+
+
+def _project_prompt_blocks(
+    level_id: int,
+    tier: int,
+    concepts: list[str],
+    generation_context: str = "",
+    theme: str | None = None,
+    avoid_concepts: list[str] | None = None,
+) -> list[dict]:
+    """Build the user-message content blocks for a project-generation request."""
+    spec = TIER_SPECS.get(tier, TIER_SPECS[1])
+    avoid_str = ", ".join(avoid_concepts) if avoid_concepts else "none"
+
+    tier_requirements = _TIER_REQUIREMENTS.get((level_id, tier), "")
+
+    context_section = f"\n\nLEVEL CONTEXT:\n{generation_context}" if generation_context else ""
+
+    lesson_block = f"""LEVEL: {level_id} - Concepts: {', '.join(concepts)}
+TIER: {tier} ({spec['desc']})
+TARGET: {spec['lines']} lines of code, {spec['steps']} steps{tier_requirements}{context_section}"""
+
+    request_block = f"""Generate a project for the level and tier above.
+THEME: {theme or 'any practical, engaging topic'}
+AVOID: {avoid_str}"""
+
+    # The lesson block is identical for every request at this level/tier, so it
+    # gets its own cache breakpoint; only the theme/avoid tail is uncached.
+    return [
+        {"type": "text", "text": lesson_block, "cache_control": _EPHEMERAL},
+        {"type": "text", "text": request_block},
+    ]
 
+
+# Shared sync client for the generation worker thread and scripts, so calls
+# reuse pooled connections instead of a fresh TLS handshake each
+_client: "Anthropic | None" = None
+
+
+def _http2_kwargs() -> dict:
+    # HTTP/2 lets concurrent calls share one TLS connection. It needs the h2
+    # package; without it httpx keeps using pooled HTTP/1.1 keep-alive.
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return {}
+    return {"http2": True}
+
+
+def _get_client() -> "Anthropic":
+    global _client
+    if _client is None:
+        import httpx
+        from anthropic import Anthropic, DefaultHttpxClient
+
+        _client = Anthropic(
+            api_key=settings.claude_api_key,
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            http_client=DefaultHttpxClient(**_http2_kwargs()),
+        )
+    return _client
+
+
+def stream_project(
+    level_id: int,
+    tier: int,
+    concepts: list[str],
+    generation_context: str = "",
+    theme: str | None = None,
+    avoid_concepts: list[str] | None = None,
+) -> Iterator[str]:
+    """Stream the raw project JSON from Claude, yielding text deltas as they arrive."""
+    if not settings.claude_api_key:
+        return
+
+    content = _project_prompt_blocks(
+        level_id, tier, concepts, generation_context, theme, avoid_concepts
+    )
     model = _model_for_tier(tier)
-    # Increase max_tokens for capstone projects (tier 3) to avoid truncation
-    max_tokens = 6000 if tier >= 3 else 4096
-    client = Anthropic(api_key=settings.claude_api_key)
-    response = client.messages.create(
+    max_tokens = _max_tokens_for_tier(tier)
+    client = _get_client()
+    with client.messages.stream(
         model=model,
         max_tokens=max_tokens,
-        messages=[{"role": "user", "content": prompt}],
-    )
+        system=_SYSTEM_BLOCKS,
+        messages=[{"role": "user", "content": content}],
+    ) as stream:
+        yield from stream.text_stream
+        _log_cache_usage("generate_project", stream.get_final_message().usage)
 
-    text = response.content[0].text.strip()
-    # Strip markdown fences if present
-    if text.startswith("```"):
-        text = text.split("\n", 1)[1]
-        if text.endswith("```"):
-            text = text[:-3]
 
+# Opening fence line (```json, ```, ...) and closing fence, if Claude wraps
+# its JSON in markdown despite being told not to
+_FENCE_RE = re.compile(r"\A```[^\n]*\n|\n?```\Z")
+
+
+def _strip_fences(text: str) -> str:
+    return _FENCE_RE.sub("", text.strip())
+
+
+def parse_project_response(text: str) -> dict | None:
+    """Parse and schema-check Claude's project JSON, or None if it is malformed."""
+    text = _strip_fences(text)
     try:
-        return json.loads(text)
-    except json.JSONDecodeError as e:
+        return decode_project(text)
+    except DecodeErrors as e:
         import sys
-        print(f"[ERROR] JSON decode failed: {e}", file=sys.stderr)
+        print(f"[ERROR] Project JSON rejected: {e}", file=sys.stderr)
         print(f"[ERROR] Response length: {len(text)} chars", file=sys.stderr)
         print(f"[ERROR] Last 500 chars: {text[-500:]}", file=sys.stderr)
         # Return None so caller can handle retry
         return None
 
 
+def generate_project(
+    level_id: int,
+    tier: int,
+    concepts: list[str],
+    generation_context: str = "",
+    theme: str | None = None,
+    avoid_concepts: list[str] | None = None,
+) -> dict | None:
+    """Generate a project using Claude API."""
+    if not settings.claude_api_key:
+        return None
+
+    text = "".join(
+        stream_project(
+            level_id, tier, concepts, generation_context, theme, avoid_concepts
+        )
+    )
+    return parse_project_response(text)
+
+
+async def generate_project_async(
+    level_id: int,
+    tier: int,
+    concepts: list[str],
+    generation_context: str = "",
+    theme: str | None = None,
+    avoid_concepts: list[str] | None = None,
+    client: "AsyncAnthropic | None" = None,
+) -> dict | None:
+    """Async variant of generate_project; several can be in flight at once."""
+    if not settings.claude_api_key:
+        return None
+
+    content = _project_prompt_blocks(
+        level_id, tier, concepts, generation_context, theme, avoid_concepts
+    )
+    client = client or _get_async_client()
+    response = await client.messages.create(
+        model=_model_for_tier(tier),
+        max_tokens=_max_tokens_for_tier(tier),
+        system=_SYSTEM_BLOCKS,
+        messages=[{"role": "user", "content": content}],
+        # Full project JSON takes far longer than the client's hint timeout
+        timeout=600.0,
+    )
+    _log_cache_usage("generate_project", response.usage)
+    return parse_project_response(response.content[0].text)
+
+
+class StepStreamParser:
+    """Incrementally extract complete step objects from streamed project JSON.
+
+    Feed text deltas as they arrive; each call returns the step dicts whose
+    closing brace has been seen since the previous call.
+    """
+
+    _STEPS_RE = re.compile(r'"steps"\s*:\s*\[')
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._in_steps = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = 0
+
+    def feed(self, text: str) -> list[dict]:
+        self._buf += text
+        steps = []
+        if self._done:
+            return steps
+
+        if not self._in_steps:
+            match = self._STEPS_RE.search(self._buf, self._pos)
+            if not match:
+                # Keep scanning from near the end in case the key is split across deltas
+                self._pos = max(0, len(self._buf) - 16)
+                return steps
+            self._in_steps = True
+            self._pos = match.end()
+
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        steps.append(jsonutil.loads(buf[self._start:i + 1]))
+                    except jsonutil.JSONDecodeError:
+                        pass
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                i += 1
+                break
+            i += 1
+        self._pos = i
+        return steps
+
+
 def repair_project(project_data: dict, errors: list[str]) -> dict | None:
     """Ask Claude to fix specific quality issues in a generated project.
 
@@ -280,7 +525,7 @@ def repair_project(project_data: dict, errors: list[str]) -> dict | None:
     if not settings.claude_api_key:
         return None
 
-    project_json = json.dumps(project_data, indent=2)
+    project_json = jsonutil.dumps(project_data, indent=True)
     error_list = "\n".join(f"- {e}" for e in errors)
 
     prompt = f"""You previously generated a Python learning project, but it has the following quality issues:
@@ -291,42 +536,64 @@ Here is the full project JSON:
 
 {project_json}
 
-Please fix ONLY the issues listed above. Keep the same project ID, name, structure, and number of steps. Do not add or remove steps.
-
-Rules for fixes:
-- If an instruction is "vague", rewrite it to specify the EXACT text for print()/input() and EXACT variable names. Look at the step's solution to determine what the instruction should say.
-- If there's an apostrophe in a single-quoted string, change the outer quotes to double quotes.
-- If mock_inputs count is wrong, provide the correct number of mock inputs for all input() calls in the accumulated code up to that step.
-- If there's an output mismatch, update expected_output to match what the accumulated code actually produces. Remember: all code runs with "import random; random.seed(42)" prepended, so random module output is deterministic.
-- If there's an execution failure with SyntaxError about "expected 'except'", it means a try: block was started but not completed before other code was added. Fix by moving the try/except block into a single step OR restructuring so the except: block completes before any other code.
-- If there's an execution failure, fix the code in the solution field.
-- Each step's "solution" must contain ONLY the new code for that step (not cumulative).
-- The "expected_output" for each step must be the COMPLETE output of running ALL accumulated code up to that step.
-
-Return ONLY the corrected JSON (no markdown fences, no explanation)."""
+Please fix ONLY the issues listed above, following the repair rules."""
 
     tier = project_data.get("tier", 1)
     model = _model_for_tier(tier)
-    client = Anthropic(api_key=settings.claude_api_key)
+    expected_steps = len(project_data.get("steps", []))
+    client = _get_client()
     try:
-        response = client.messages.create(
+        parser = StepStreamParser()
+        chunks = []
+        seen_steps = 0
+        with client.messages.stream(
             model=model,
-            max_tokens=4096,
+            max_tokens=_max_tokens_for_tier(tier),
+            system=_REPAIR_SYSTEM_BLOCKS,
             messages=[{"role": "user", "content": prompt}],
-        )
-
-        text = response.content[0].text.strip()
-        # Strip markdown fences if present
-        if text.startswith("```"):
-            text = text.split("\n", 1)[1]
-            if text.endswith("```"):
-                text = text[:-3]
-
-        return json.loads(text)
+        ) as stream:
+            for delta in stream.text_stream:
+                chunks.append(delta)
+                seen_steps += len(parser.feed(delta))
+                if seen_steps > expected_steps:
+                    # Claude added steps despite being told not to — close
+                    # the stream now rather than pay for the rest of it
+                    import sys
+                    print("[DEBUG] repair_project: aborted, too many steps", file=sys.stderr)
+                    return None
+            _log_cache_usage("repair_project", stream.get_final_message().usage)
+
+        return decode_project(_strip_fences("".join(chunks)))
     except Exception:
         return None
 
 
+# Hints only need the code around where the student is stuck, and the head
+# (exception) and tail (offending line) of a long error
+_HINT_CODE_LINES = 40
+_HINT_ERROR_CHARS = 500
+
+
+def _trim_hint_context(code: str, error: str | None) -> tuple[str, str | None]:
+    code = "\n".join(code.splitlines()[-_HINT_CODE_LINES:])
+    if error and len(error) > 2 * _HINT_ERROR_CHARS:
+        error = error[:_HINT_ERROR_CHARS] + "\n...\n" + error[-_HINT_ERROR_CHARS:]
+    return code, error
+
+
+def _hint_prompt(instruction: str, code: str, error: str | None) -> str:
+    code, error = _trim_hint_context(code, error)
+    context = f"Instruction: {instruction}\nUser's code:\n{code}"
+    if error:
+        context += f"\nError: {error}"
+
+    return f"""A Python beginner is stuck on this step. Give a short, helpful hint (2-3 sentences max). Don't give away the answer, but guide them in the right direction.
+
+{context}
+
+Hint:"""
+
+
 def generate_hint(
     instruction: str,
     code: str,
@@ -336,21 +603,95 @@ def generate_hint(
     if not settings.claude_api_key:
         return "Try re-reading the instruction carefully and check your syntax."
 
-    context = f"Instruction: {instruction}\nUser's code:\n{code}"
-    if error:
-        context += f"\nError: {error}"
+    prompt = _hint_prompt(instruction, code, error)
+    client = _get_client()
+    response = client.messages.create(
+        model=settings.claude_hint_model,
+        max_tokens=256,
+        messages=[{"role": "user", "content": prompt}],
+    )
 
-    prompt = f"""A Python beginner is stuck on this step. Give a short, helpful hint (2-3 sentences max). Don't give away the answer, but guide them in the right direction.
+    return response.content[0].text.strip()
 
-{context}
 
-Hint:"""
+# Shared async client for request-path calls, so waiting on Claude doesn't
+# hold a threadpool slot. Created lazily, closed by the app lifespan.
+_async_client: "AsyncAnthropic | None" = None
 
-    client = Anthropic(api_key=settings.claude_api_key)
-    response = client.messages.create(
-        model=settings.claude_model,
+
+def _get_async_client() -> "AsyncAnthropic":
+    global _async_client
+    if _async_client is None:
+        import httpx
+        from anthropic import AsyncAnthropic, DefaultAsyncHttpxClient
+
+        _async_client = AsyncAnthropic(
+            api_key=settings.claude_api_key,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            http_client=DefaultAsyncHttpxClient(**_http2_kwargs()),
+        )
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+
+async def generate_hint_async(
+    instruction: str,
+    code: str,
+    error: str | None = None,
+) -> str:
+    """Async variant of generate_hint for use from request handlers."""
+    if not settings.claude_api_key:
+        return "Try re-reading the instruction carefully and check your syntax."
+
+    prompt = _hint_prompt(instruction, code, error)
+    response = await _get_async_client().messages.create(
+        model=settings.claude_hint_model,
         max_tokens=256,
         messages=[{"role": "user", "content": prompt}],
     )
 
     return response.content[0].text.strip()
+
+
+async def generate_hints_batch_async(
+    items: list[tuple[str, str, str | None]],
+) -> list[str]:
+    """Generate hints for several (instruction, code, error) items in one call.
+
+    Raises ValueError if Claude does not return exactly one hint per item.
+    """
+    sections = []
+    for i, (instruction, code, error) in enumerate(items, 1):
+        code, error = _trim_hint_context(code, error)
+        section = f"ITEM {i}:\nInstruction: {instruction}\nUser's code:\n{code}"
+        if error:
+            section += f"\nError: {error}"
+        sections.append(section)
+
+    prompt = f"""Several Python beginners are each stuck on a step. For each item, give a short, helpful hint (2-3 sentences max). Don't give away the answer, but guide them in the right direction.
+
+{chr(10).join(sections)}
+
+Return ONLY a JSON array of {len(items)} strings, one hint per item in the same order (no markdown, no explanation)."""
+
+    response = await _get_async_client().messages.create(
+        model=settings.claude_hint_model,
+        max_tokens=256 * len(items),
+        messages=[{"role": "user", "content": prompt}],
+    )
+
+    hints = jsonutil.loads(response.content[0].text.strip())
+    if (
+        not isinstance(hints, list)
+        or len(hints) != len(items)
+        or not all(isinstance(h, str) for h in hints)
+    ):
+        raise ValueError("Batched hint response did not match the requested items")
+    return [h.strip() for h in hints]
+
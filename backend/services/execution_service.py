@@ -1,30 +1,27 @@
-import json
-from sqlmodel import Session
+from cachetools import LRUCache
 
 from backend.storage.database import Project
-from backend.sandbox.executor import execute_code
+from backend.sandbox.executor import execute_code_async
 from backend.services.validation_service import validate_output
 
+# Decoded steps, keyed by the project's stored steps JSON. The row itself is
+# still loaded per request (a primary-key lookup), so a deleted or
+# regenerated project never hits a stale entry in any worker process; only
+# the decode is skipped.
+_steps_cache: LRUCache = LRUCache(maxsize=256)
 
-def run_and_validate(
-    project_id: str,
+
+async def run_and_validate(
+    project: Project | None,
     step_num: int,
     code: str,
     accumulated_code: str,
-    session: Session,
 ) -> dict:
     """Execute user code and validate against expected output for the step."""
-    project = session.get(Project, project_id)
     if not project:
         return {"success": False, "output": "", "match": False, "feedback": "Project not found."}
 
-    steps = json.loads(project.steps)
-    step = None
-    for s in steps:
-        if s["step_num"] == step_num:
-            step = s
-            break
-
+    step = _steps_by_num(project).get(step_num)
     if not step:
         return {"success": False, "output": "", "match": False, "feedback": "Step not found."}
 
@@ -35,7 +32,7 @@ def run_and_validate(
     mock_inputs = step.get("mock_inputs", [])
 
     # Execute
-    result = execute_code(full_code, mock_inputs)
+    result = await execute_code_async(full_code, mock_inputs)
 
     if not result["success"]:
         return {
@@ -56,3 +53,10 @@ def run_and_validate(
         "match": validation["match"],
         "feedback": validation["feedback"],
     }
+
+
+def _steps_by_num(project: Project) -> dict[int, dict]:
+    steps = _steps_cache.get(project.steps)
+    if steps is None:
+        steps = _steps_cache[project.steps] = project.steps_by_num
+    return steps
@@ -0,0 +1,77 @@
+"""Dynamic batching for concurrent hint requests.
+
+Hints arriving within a short window are sent to Claude as one request
+asking for a JSON array of hints, then split back out to each caller. This
+amortizes per-request overhead when many students ask for hints at once.
+"""
+
+import asyncio
+
+from backend.services.claude_service import (
+    generate_hint_async,
+    generate_hints_batch_async,
+)
+
+
+class HintBatcher:
+    """Collects hint requests for up to max_delay seconds or max_batch_size items."""
+
+    def __init__(self, max_batch_size: int = 8, max_delay: float = 0.05):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._pending: list[tuple[tuple[str, str, str | None], asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def get_hint(self, instruction: str, code: str, error: str | None = None) -> str:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(((instruction, code, error), future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Keep a reference so the task isn't garbage-collected mid-flight
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[tuple[str, str, str | None], asyncio.Future]]):
+        items = [item for item, _ in batch]
+        futures = [future for _, future in batch]
+
+        if len(items) > 1:
+            try:
+                hints = await generate_hints_batch_async(items)
+            except Exception:
+                # Malformed or failed batch — fall back to one call per item
+                hints = None
+            if hints is not None:
+                for future, hint in zip(futures, hints):
+                    if not future.done():
+                        future.set_result(hint)
+                return
+
+        results = await asyncio.gather(
+            *(generate_hint_async(*item) for item in items),
+            return_exceptions=True,
+        )
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -1,9 +1,58 @@
-import json
+from datetime import datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
 
 from backend.storage.database import Progress, Project
 
 
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def completion_upsert(
+    user_id: str,
+    project_id: str,
+    step_nums: list[int],
+    codes: dict[int, str] | None = None,
+):
+    """One INSERT ... ON CONFLICT DO UPDATE marking the steps completed.
+
+    Relies on the unique (user_id, project_id, step_num) index. codes maps
+    step_num to the submitted code; without it, existing rows keep theirs.
+    """
+    now = _now_iso()
+    stmt = sqlite_insert(Progress).values([
+        {
+            "user_id": user_id,
+            "project_id": project_id,
+            "step_num": step_num,
+            "completed": True,
+            "completed_at": now,
+            "code": codes.get(step_num, "") if codes else "",
+        }
+        for step_num in step_nums
+    ])
+    set_ = {"completed": True, "completed_at": stmt.excluded.completed_at}
+    if codes:
+        set_["code"] = stmt.excluded.code
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "project_id", "step_num"],
+        set_=set_,
+    )
+
+
+def bulk_mark_completed(
+    user_id: str, project_id: str, step_nums: list[int], session: Session
+):
+    """Mark several steps of a project completed in a single statement."""
+    if not step_nums:
+        return
+    session.exec(completion_upsert(user_id, project_id, step_nums))
+    session.commit()
+
+
 def get_user_progress(user_id: str, session: Session) -> dict:
     """Get comprehensive progress for a user."""
     progress_records = session.exec(
@@ -22,17 +71,20 @@ def get_user_progress(user_id: str, session: Session) -> dict:
         if p.completed:
             projects_progress[p.project_id]["steps_completed"].append(p.step_num)
 
+    # One query for every project; it serves both the completion check and
+    # the level summary
+    all_projects = session.exec(select(Project)).all()
+    by_id = {proj.id: proj for proj in all_projects}
+
     # Check if projects are fully complete
     for pid, pp in projects_progress.items():
-        project = session.get(Project, pid)
+        project = by_id.get(pid)
         if project:
-            steps = json.loads(project.steps)
-            total_steps = len(steps)
+            total_steps = project.total_steps_count
             pp["total_steps"] = total_steps
             pp["is_complete"] = len(pp["steps_completed"]) >= total_steps
 
     # Calculate level completion
-    all_projects = session.exec(select(Project)).all()
     levels_status = {}
     for proj in all_projects:
         if proj.level_id not in levels_status:
@@ -46,6 +98,26 @@ def get_user_progress(user_id: str, session: Session) -> dict:
     }
 
 
+def _any_project_complete(projects: list[Project], user_id: str, session: Session) -> bool:
+    """True if the user has completed every step of at least one of the projects."""
+    if not projects:
+        return False
+
+    # Completed-step counts for all candidate projects in one query
+    counts = dict(session.exec(
+        select(Progress.project_id, func.count())
+        .where(
+            Progress.user_id == user_id,
+            Progress.completed == True,
+            Progress.project_id.in_([proj.id for proj in projects]),
+        )
+        .group_by(Progress.project_id)
+    ).all())
+    return any(
+        counts.get(proj.id, 0) >= proj.total_steps_count for proj in projects
+    )
+
+
 def is_tier_unlocked(level_id: int, tier: int, user_id: str, session: Session) -> bool:
     """Check if a tier is unlocked for a user."""
     if level_id == 1 and tier == 1:
@@ -63,19 +135,7 @@ def is_tier_unlocked(level_id: int, tier: int, user_id: str, session: Session) -
             prev_projects = session.exec(
                 select(Project).where(Project.level_id == level_id - 1)
             ).all()
-
-        for proj in prev_projects:
-            progress = session.exec(
-                select(Progress).where(
-                    Progress.user_id == user_id,
-                    Progress.project_id == proj.id,
-                    Progress.completed == True,
-                )
-            ).all()
-            steps = json.loads(proj.steps)
-            if len(progress) >= len(steps):
-                return True
-        return False
+        return _any_project_complete(prev_projects, user_id, session)
 
     # Tier 2 needs tier 1 complete; tier 3 needs tier 2 complete
     prev_tier_projects = session.exec(
@@ -83,15 +143,4 @@ def is_tier_unlocked(level_id: int, tier: int, user_id: str, session: Session) -
             Project.level_id == level_id, Project.tier == tier - 1
         )
     ).all()
-    for proj in prev_tier_projects:
-        progress = session.exec(
-            select(Progress).where(
-                Progress.user_id == user_id,
-                Progress.project_id == proj.id,
-                Progress.completed == True,
-            )
-        ).all()
-        steps = json.loads(proj.steps)
-        if len(progress) >= len(steps):
-            return True
-    return False
+    return _any_project_complete(prev_tier_projects, user_id, session)
@@ -0,0 +1,54 @@
+"""On-disk cache of validated generated projects, keyed by prompt parameters.
+
+Regenerating seeds asks Claude for the same (level, tier, concepts) over and
+over; a project that already passed validation for those parameters (and
+the same model) is reused instead of paying for another generation. Only
+validated projects are stored, so a cache hit never short-circuits a retry.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+from backend import jsonutil
+from backend.services.claude_service import _model_for_tier
+
+CACHE_DIR = Path("data/cache")
+
+
+def cache_key(
+    level_id: int,
+    tier: int,
+    concepts: list[str],
+    generation_context: str = "",
+    theme: str | None = None,
+    avoid_concepts: list[str] | None = None,
+) -> str:
+    params = {
+        "level_id": level_id,
+        "tier": tier,
+        "concepts": sorted(concepts),
+        "generation_context": generation_context,
+        "theme": theme,
+        "avoid_concepts": sorted(avoid_concepts or []),
+        "model": _model_for_tier(tier),
+    }
+    # Stdlib json on purpose: keys must stay stable across orjson versions
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def get(key: str) -> dict | None:
+    path = CACHE_DIR / f"{key}.json"
+    try:
+        return jsonutil.loads(path.read_bytes())
+    except (FileNotFoundError, jsonutil.JSONDecodeError):
+        return None
+
+
+def put(key: str, project: dict):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = CACHE_DIR / f"{key}.json"
+    # Write-then-rename so an interrupted run never leaves a truncated entry
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(jsonutil.dumps(project, indent=True), encoding="utf-8")
+    tmp.replace(path)
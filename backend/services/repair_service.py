@@ -9,10 +9,22 @@ import re
 
 from backend.sandbox.executor import execute_code
 from backend.quality import (
+    _INPUT_RE,
     fix_cumulative_solutions,
     validate_project_quality,
 )
 
+# Written to stdout after each step by _fix_expected_outputs' single run:
+# the step index and how many mock inputs had been consumed by then
+_STEP_MARK_TMPL = (
+    '__import__("sys").stdout.write('
+    '"\\x1e%d:%%d\\x1e" %% globals().get("_input_index", 0))'
+)
+_STEP_MARK_RE = re.compile(r"\x1e(\d+):(\d+)\x1e")
+
+# A single-quoted string with an apostrophe inside, e.g. 'it's'
+_APOS_STRING_RE = re.compile(r"'([^']*[a-zA-Z]'[a-zA-Z][^']*)'")
+
 
 def auto_fix_project(project_data: dict, errors: list[str]) -> tuple[dict, list[str]]:
     """Phase 1: fix what we can programmatically, without an API call.
@@ -24,6 +36,15 @@ def auto_fix_project(project_data: dict, errors: list[str]) -> tuple[dict, list[
 
     Returns (fixed_project, remaining_errors).
     """
+    apply_auto_fixes(project_data)
+
+    # Re-validate to find remaining errors
+    remaining, _ = validate_project_quality(project_data)
+    return project_data, remaining
+
+
+def apply_auto_fixes(project_data: dict):
+    """Apply the Phase 1 fixes in place, without re-validating."""
     steps = project_data.get("steps", [])
 
     # --- Fix apostrophe in single-quoted strings ---
@@ -35,10 +56,6 @@ def auto_fix_project(project_data: dict, errors: list[str]) -> tuple[dict, list[
     # --- Fix expected_output by re-executing accumulated code ---
     _fix_expected_outputs(steps)
 
-    # Re-validate to find remaining errors
-    remaining = validate_project_quality(project_data)
-    return project_data, remaining
-
 
 def claude_repair_project(project_data: dict, errors: list[str]) -> dict | None:
     """Phase 2: ask Claude to fix issues that need language understanding.
@@ -73,10 +90,12 @@ def claude_repair_project(project_data: dict, errors: list[str]) -> dict | None:
 
 def _fix_apostrophe_quotes(steps: list[dict]):
     """Swap single-quoted strings containing apostrophes to double quotes."""
-    pattern = re.compile(r"'([^']*[a-zA-Z]'[a-zA-Z][^']*)'")
     for step in steps:
         solution = step.get("solution", "")
-        step["solution"] = pattern.sub(r'"\1"', solution)
+        # Most steps have no single quotes at all; skip the regex for those
+        if "'" not in solution:
+            continue
+        step["solution"] = _APOS_STRING_RE.sub(r'"\1"', solution)
 
 
 def _fix_mock_inputs(steps: list[dict]):
@@ -90,15 +109,11 @@ def _fix_mock_inputs(steps: list[dict]):
     if not all_mocks:
         return
 
-    # Walk forward, ensuring each step has enough mock_inputs
-    accumulated_code = ""
+    # Walk forward, ensuring each step has enough mock_inputs. Each step's
+    # new code is scanned once; the accumulated count is a running total.
+    input_count = 0
     for step in steps:
-        if accumulated_code:
-            accumulated_code += "\n" + step["solution"]
-        else:
-            accumulated_code = step["solution"]
-
-        input_count = len(re.findall(r"\binput\s*\(", accumulated_code))
+        input_count += len(_INPUT_RE.findall(step["solution"]))
         current_mocks = step.get("mock_inputs", [])
 
         if input_count > len(current_mocks):
@@ -109,6 +124,25 @@ def _fix_mock_inputs(steps: list[dict]):
 def _fix_expected_outputs(steps: list[dict]):
     """Re-execute accumulated code at each step and replace expected_output."""
     import sys
+
+    outputs = _step_outputs_single_run(steps)
+    if outputs is None:
+        outputs = _step_outputs_per_step(steps)
+
+    for step, new_output in zip(steps, outputs):
+        if new_output is None:
+            continue
+        old_output = step.get("expected_output", "")
+        if old_output != new_output:
+            print(f"[DEBUG] Step {step['step_num']}: Updated expected_output", file=sys.stderr)
+            print(f"  Old: {repr(old_output[:80])}", file=sys.stderr)
+            print(f"  New: {repr(new_output[:80])}", file=sys.stderr)
+        step["expected_output"] = new_output
+
+
+def _step_outputs_per_step(steps: list[dict]) -> list[str | None]:
+    """Each step's accumulated output, one execution per step (None if it failed)."""
+    outputs = []
     accumulated_code = ""
     for step in steps:
         if accumulated_code:
@@ -116,14 +150,78 @@ def _fix_expected_outputs(steps: list[dict]):
         else:
             accumulated_code = step["solution"]
 
-        mock_inputs = step.get("mock_inputs", [])
-        result = execute_code(accumulated_code, mock_inputs)
-
-        if result["success"]:
-            old_output = step.get("expected_output", "")
-            new_output = result.get("output", "")
-            if old_output != new_output:
-                print(f"[DEBUG] Step {step['step_num']}: Updated expected_output", file=sys.stderr)
-                print(f"  Old: {repr(old_output[:80])}", file=sys.stderr)
-                print(f"  New: {repr(new_output[:80])}", file=sys.stderr)
-            step["expected_output"] = new_output
+        result = execute_code(accumulated_code, step.get("mock_inputs", []))
+        outputs.append(result.get("output", "") if result["success"] else None)
+    return outputs
+
+
+def _step_outputs_single_run(steps: list[dict]) -> list[str | None] | None:
+    """Each step's accumulated output from one run of the full program.
+
+    A marker written after every step splits the output; it is indented like
+    the next step so it can sit inside a class body that step continues. A
+    step whose accumulated code doesn't compile on its own (e.g. an if: whose
+    body the next step supplies) gets None, as its own run would have failed.
+
+    Returns None when the result might differ from running each step on its
+    own, so the caller falls back to _step_outputs_per_step: a step's
+    mock_inputs that aren't a prefix of the last step's, a step that consumed
+    more inputs than it mocks, a failed run (including a marker that breaks
+    the syntax), a marker that ran out of order or not exactly once, or
+    output after the last step (e.g. atexit handlers, which would have run
+    after every step).
+    """
+    if not steps:
+        return []
+
+    final_mocks = steps[-1].get("mock_inputs", [])
+    step_mocks = [step.get("mock_inputs", []) for step in steps]
+    if any(mocks != final_mocks[:len(mocks)] for mocks in step_mocks):
+        return None
+
+    parts = []
+    compiles = []
+    for i, step in enumerate(steps):
+        parts.append(step["solution"])
+        compiles.append(_compiles("\n".join(parts[::2])))
+        indent = _leading_indent(steps[i + 1]["solution"]) if i + 1 < len(steps) else ""
+        parts.append(indent + _STEP_MARK_TMPL % i)
+    instrumented = "\n".join(parts)
+    if not _compiles(instrumented):
+        return None
+
+    result = execute_code(instrumented, final_mocks)
+    if not result["success"]:
+        return None
+
+    output = result["output"]
+    outputs = []
+    chunks = []
+    pos = 0
+    for i, match in enumerate(_STEP_MARK_RE.finditer(output)):
+        if i >= len(steps) or int(match.group(1)) != i:
+            return None
+        if int(match.group(2)) > len(step_mocks[i]):
+            return None
+        chunks.append(output[pos:match.start()])
+        outputs.append("".join(chunks) if compiles[i] else None)
+        pos = match.end()
+
+    if len(outputs) != len(steps) or output[pos:]:
+        return None
+    return outputs
+
+
+def _compiles(code: str) -> bool:
+    try:
+        compile(code, "<step>", "exec")
+    except (SyntaxError, ValueError):
+        return False
+    return True
+
+
+def _leading_indent(code: str) -> str:
+    for line in code.splitlines():
+        if line.strip():
+            return line[:len(line) - len(line.lstrip())]
+    return ""
@@ -2,6 +2,15 @@ import re
 
 from difflib import SequenceMatcher
 
+_FLOAT_RE = re.compile(r"-?\d+\.\d+")
+
+# SequenceMatcher is quadratic, so feedback only compares this many characters
+# from each end of long outputs
+_RATIO_WINDOW = 2048
+
+# Similarity above which feedback calls the output "partially correct"
+_PARTIAL_RATIO = 0.3
+
 
 def validate_output(actual: str, expected: str) -> dict:
     """Compare actual output against expected output with flexible matching."""
@@ -18,33 +27,40 @@ def validate_output(actual: str, expected: str) -> dict:
     if actual == expected:
         return {"match": True, "feedback": "Perfect!"}
 
-    # Normalized match (trailing whitespace, trailing newlines)
-    if _normalize(actual) == _normalize(expected):
+    # Normalized match (trailing whitespace, trailing newlines). The
+    # normalized lines are reused by the checks below.
+    actual_lines = _normalize_lines(actual)
+    expected_lines = _normalize_lines(expected)
+    if actual_lines == expected_lines:
         return {"match": True, "feedback": "Perfect!"}
 
     # Float-tolerant match
-    if _float_tolerant_match(actual, expected):
+    if _float_tolerant_match(actual_lines, expected_lines):
         return {"match": True, "feedback": "Perfect!"}
 
     # No match — generate helpful feedback
-    return {"match": False, "feedback": _generate_feedback(actual, expected)}
+    return {"match": False, "feedback": _generate_feedback(actual_lines, expected_lines)}
 
 
 def _normalize(text: str) -> str:
     """Normalize whitespace: strip trailing spaces per line, normalize line endings."""
-    lines = text.replace("\r\n", "\n").split("\n")
-    # Strip trailing whitespace from each line, remove trailing empty lines
-    lines = [line.rstrip() for line in lines]
+    return "\n".join(_normalize_lines(text))
+
+
+def _normalize_lines(text: str) -> list[str]:
+    """Lines of the normalized text, for callers that compare line by line."""
+    # rstrip also drops the \r of \r\n line endings
+    lines = [line.rstrip() for line in text.split("\n")]
+    # Remove trailing empty lines
     while lines and lines[-1] == "":
         lines.pop()
-    return "\n".join(lines)
-
+    return lines
 
-def _float_tolerant_match(actual: str, expected: str, tolerance: float = 0.001) -> bool:
-    """Check if outputs match when allowing float precision differences."""
-    actual_lines = _normalize(actual).split("\n")
-    expected_lines = _normalize(expected).split("\n")
 
+def _float_tolerant_match(
+    actual_lines: list[str], expected_lines: list[str], tolerance: float = 0.001
+) -> bool:
+    """Check if normalized outputs match when allowing float precision differences."""
     if len(actual_lines) != len(expected_lines):
         return False
 
@@ -67,9 +83,8 @@ def _float_tolerant_match(actual: str, expected: str, tolerance: float = 0.001)
 
 def _lines_float_close(a: str, e: str, tolerance: float) -> bool:
     """Check if two lines are the same except for float precision."""
-    float_pattern = r"-?\d+\.\d+"
-    a_floats = re.findall(float_pattern, a)
-    e_floats = re.findall(float_pattern, e)
+    a_floats = _FLOAT_RE.findall(a)
+    e_floats = _FLOAT_RE.findall(e)
 
     if len(a_floats) != len(e_floats):
         return False
@@ -78,8 +93,8 @@ def _lines_float_close(a: str, e: str, tolerance: float) -> bool:
         return False
 
     # Replace floats with placeholders and compare the rest
-    a_template = re.sub(float_pattern, "{}", a)
-    e_template = re.sub(float_pattern, "{}", e)
+    a_template = _FLOAT_RE.sub("{}", a)
+    e_template = _FLOAT_RE.sub("{}", e)
     if a_template != e_template:
         return False
 
@@ -90,21 +105,15 @@ def _lines_float_close(a: str, e: str, tolerance: float) -> bool:
     return True
 
 
-def _generate_feedback(actual: str, expected: str) -> str:
-    """Generate helpful feedback based on how close the output is."""
-    actual_norm = _normalize(actual)
-    expected_norm = _normalize(expected)
-
-    ratio = SequenceMatcher(None, actual_norm, expected_norm).ratio()
-
-    actual_lines = actual_norm.split("\n")
-    expected_lines = expected_norm.split("\n")
-
+def _generate_feedback(actual_lines: list[str], expected_lines: list[str]) -> str:
+    """Generate helpful feedback based on how close the normalized output is."""
     if len(actual_lines) != len(expected_lines):
         line_diff = len(actual_lines) - len(expected_lines)
         direction = "more" if line_diff > 0 else "fewer"
-        hint = f"Your output has {abs(line_diff)} {direction} line(s) than expected."
-    elif ratio > 0.9:
+        return f"Your output has {abs(line_diff)} {direction} line(s) than expected."
+
+    ratio = _similarity("\n".join(actual_lines), "\n".join(expected_lines))
+    if ratio > 0.9:
         # Find the first differing line
         for i, (a, e) in enumerate(zip(actual_lines, expected_lines)):
             if a != e:
@@ -114,7 +123,7 @@ def _generate_feedback(actual: str, expected: str) -> str:
             hint = "Very close! Check for small differences in spacing or punctuation."
     elif ratio > 0.6:
         hint = "Right idea, but the output needs adjustment. Check your print statements carefully."
-    elif ratio > 0.3:
+    elif ratio > _PARTIAL_RATIO:
         hint = "Your output is partially correct. Re-read the instructions and check each print statement."
     else:
         hint = "The output doesn't match what's expected. Review the instructions and try again."
@@ -122,6 +131,28 @@ def _generate_feedback(actual: str, expected: str) -> str:
     return hint
 
 
+def _similarity(a: str, b: str) -> float:
+    """SequenceMatcher ratio, skipped or windowed when that would be slow."""
+    shorter, longer = sorted((len(a), len(b)))
+    # The ratio is at most 2 * shorter / (shorter + longer); when even that
+    # can't clear the "partially correct" band (one output over ~5.67 times
+    # the length of the other), skip the comparison
+    if longer and 2 * shorter <= _PARTIAL_RATIO * (shorter + longer):
+        return 0.0
+    small = longer <= 2 * _RATIO_WINDOW
+    if not small:
+        a = _window(a)
+        b = _window(b)
+    # Disabling the popular-element heuristic is only affordable on short input
+    return SequenceMatcher(None, a, b, autojunk=not small).ratio()
+
+
+def _window(text: str) -> str:
+    if len(text) <= 2 * _RATIO_WINDOW:
+        return text
+    return text[:_RATIO_WINDOW] + text[-_RATIO_WINDOW:]
+
+
 # ---------------------------------------------------------------------------
 # Generation-time quality validation
 # ---------------------------------------------------------------------------
@@ -154,7 +185,7 @@ def validate_step_outputs(project_data: dict) -> list[str]:
         expected = step.get("expected_output", "")
         if expected:
             actual = result.get("output", "")
-            if _normalize(actual) != _normalize(expected):
+            if _normalize_lines(actual) != _normalize_lines(expected):
                 errors.append(
                     f"Step {step['step_num']}: output mismatch. "
                     f"Expected: {repr(expected[:100])} Got: {repr(actual[:100])}"
@@ -1,9 +1,15 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
 from pathlib import Path
+from sqlalchemy import Index, event, insert, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel, Field, Session, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import Optional
 from datetime import datetime
 
+from backend import jsonutil
 from backend.config import settings
 
 
@@ -18,16 +24,23 @@ class Lesson(SQLModel, table=True):
     examples: str  # JSON list
     prerequisite_id: Optional[int] = None
 
-    @property
+    # JSON columns are decoded once per instance; don't mutate the result
+
+    @cached_property
     def concepts_list(self) -> list[str]:
-        return json.loads(self.concepts)
+        return jsonutil.loads(self.concepts)
 
-    @property
+    @cached_property
     def examples_list(self) -> list[str]:
-        return json.loads(self.examples)
+        return jsonutil.loads(self.examples)
 
 
 class Project(SQLModel, table=True):
+    # list_projects filters by level and tier and orders by both
+    __table_args__ = (
+        Index("ix_project_level_tier", "level_id", "tier"),
+    )
+
     id: str = Field(primary_key=True)
     level_id: int = Field(index=True)
     tier: int = Field(index=True)  # 1=basic, 2=intermediate, 3=capstone
@@ -37,13 +50,33 @@ class Project(SQLModel, table=True):
     concepts_used: str  # JSON list
     total_lines: int
     steps: str  # JSON list of step objects
+    # len(steps), stored at insert so completion counts never decode steps.
+    # Required: a row left at 0 would count as complete with no progress.
+    total_steps_count: int
     full_solution: str
     difficulty_rating: int = 1
     estimated_minutes: int = 10
     is_generated: bool = False
 
+    # Decoded once per instance, like Lesson.concepts_list
+
+    @cached_property
+    def steps_list(self) -> list[dict]:
+        return jsonutil.loads(self.steps)
+
+    @cached_property
+    def steps_by_num(self) -> dict[int, dict]:
+        return {step["step_num"]: step for step in self.steps_list}
+
 
 class Progress(SQLModel, table=True):
+    # One row per (user, project, step) — lets mark_complete upsert. The
+    # completed index serves the completed-step counts in progress_service.
+    __table_args__ = (
+        Index("ix_progress_user_project_step", "user_id", "project_id", "step_num", unique=True),
+        Index("ix_progress_user_project_completed", "user_id", "project_id", "completed"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(default="default", index=True)
     project_id: str = Field(index=True)
@@ -57,15 +90,87 @@ class Progress(SQLModel, table=True):
 
 DB_DIR = Path("data/db")
 DB_DIR.mkdir(parents=True, exist_ok=True)
-engine = create_engine(f"sqlite:///{DB_DIR}/mimo.db", echo=False)
+# Each uvicorn worker process gets its own pool on the shared SQLite file
+engine = create_engine(
+    f"sqlite:///{DB_DIR}/mimo.db",
+    echo=False,
+    pool_size=5,
+    max_overflow=10,
+    pool_pre_ping=True,
+)
+
+# Request handlers use the async engine so a slow request never parks a
+# threadpool slot on a connection. The sync engine above serves seeding,
+# scripts and the generation worker thread.
+async_engine = create_async_engine(
+    f"sqlite+aiosqlite:///{DB_DIR}/mimo.db",
+    echo=False,
+    pool_size=5,
+    max_overflow=20,
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+
+# WAL lets readers proceed during a write and, with synchronous=NORMAL,
+# fsyncs at checkpoints rather than on every commit. journal_mode is stored
+# in the database file; the rest are per connection.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",  # 64 MiB
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(async_engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
 
 
 def init_db():
     SQLModel.metadata.create_all(engine)
-
-
-def get_session():
-    with Session(engine) as session:
+    _ensure_columns()
+    _ensure_indexes()
+
+
+def _ensure_columns():
+    """Add columns introduced after a database was created, with backfill."""
+    with engine.begin() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(project)"))}
+        if "total_steps_count" not in columns:
+            conn.execute(text(
+                "ALTER TABLE project ADD COLUMN total_steps_count INTEGER NOT NULL DEFAULT 0"
+            ))
+            conn.execute(text("UPDATE project SET total_steps_count = json_array_length(steps)"))
+
+
+def _ensure_indexes():
+    """Add indexes declared on the models to databases created before them.
+
+    create_all() only creates indexes along with new tables, so existing
+    databases need them added explicitly.
+    """
+    with engine.begin() as conn:
+        # Collapse duplicate progress rows left by the old select-then-insert
+        # path so the unique index can be built
+        conn.execute(text(
+            "DELETE FROM progress WHERE id NOT IN ("
+            "SELECT MAX(id) FROM progress GROUP BY user_id, project_id, step_num)"
+        ))
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+async def get_session():
+    async with AsyncSessionLocal() as session:
         yield session
 
 
@@ -80,21 +185,28 @@ def seed_lessons():
         if not lessons_file.exists():
             return
 
-        lessons_data = json.loads(lessons_file.read_text())
-        for item in lessons_data:
-            lesson = Lesson(
-                id=item["id"],
-                name=item["name"],
-                description=item["description"],
-                generation_context=item.get("generation_context"),
-                concepts=json.dumps(item["concepts"]),
-                examples=json.dumps(item["examples"]),
-                prerequisite_id=item.get("prerequisite_id"),
-            )
-            session.add(lesson)
+        lessons_data = jsonutil.loads(lessons_file.read_bytes())
+        rows = [
+            {
+                "id": item["id"],
+                "name": item["name"],
+                "description": item["description"],
+                "generation_context": item.get("generation_context"),
+                "concepts": json.dumps(item["concepts"]),
+                "examples": json.dumps(item["examples"]),
+                "prerequisite_id": item.get("prerequisite_id"),
+            }
+            for item in lessons_data
+        ]
+        if rows:
+            session.execute(insert(Lesson), rows)
         session.commit()
 
 
+def _read_json(path: Path):
+    return jsonutil.loads(path.read_bytes())
+
+
 def seed_projects():
     """Seed projects from data/projects/*.json if table is empty."""
     with Session(engine) as session:
@@ -106,22 +218,32 @@ def seed_projects():
         if not projects_dir.exists():
             return
 
-        for pfile in sorted(projects_dir.glob("*.json")):
-            data = json.loads(pfile.read_text())
-            project = Project(
-                id=data["id"],
-                level_id=data["level_id"],
-                tier=data["tier"],
-                name=data["name"],
-                description=data["description"],
-                learning_goals=json.dumps(data["learning_goals"]),
-                concepts_used=json.dumps(data["concepts_used"]),
-                total_lines=data["total_lines"],
-                steps=json.dumps(data["steps"]),
-                full_solution=data["full_solution"],
-                difficulty_rating=data.get("difficulty_rating", 1),
-                estimated_minutes=data.get("estimated_minutes", 10),
-                is_generated=data.get("is_generated", False),
-            )
-            session.add(project)
+        # Reading the files is I/O bound, so overlap it across threads
+        files = sorted(projects_dir.glob("*.json"))
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            projects_data = list(pool.map(_read_json, files))
+
+        rows = [
+            {
+                "id": data["id"],
+                "level_id": data["level_id"],
+                "tier": data["tier"],
+                "name": data["name"],
+                "description": data["description"],
+                "learning_goals": json.dumps(data["learning_goals"]),
+                "concepts_used": json.dumps(data["concepts_used"]),
+                "total_lines": data["total_lines"],
+                "steps": json.dumps(data["steps"]),
+                "total_steps_count": len(data["steps"]),
+                "full_solution": data["full_solution"],
+                "difficulty_rating": data.get("difficulty_rating", 1),
+                "estimated_minutes": data.get("estimated_minutes", 10),
+                "is_generated": data.get("is_generated", False),
+            }
+            for data in projects_data
+        ]
+        # One executemany of a single prepared INSERT rather than an ORM
+        # flush per object
+        if rows:
+            session.execute(insert(Project), rows)
         session.commit()
@@ -1,5 +1,6 @@
 """Generate seed projects for all 9 levels x 3 tiers.
 Validates each project by executing the full solution AND running quality checks before saving.
+Projects are generated concurrently (--concurrency) with Claude requests rate-limited (--rpm).
 
 Usage:
   python -m scripts.generate_seeds              # Generate all missing projects
@@ -8,43 +9,122 @@ Usage:
   python -m scripts.generate_seeds --level 1 --tier 2  # Level 1, Intermediate only
   python -m scripts.generate_seeds --tier 1      # Basic tier across all levels
   python -m scripts.generate_seeds --force       # Regenerate even if files exist
+  python -m scripts.generate_seeds --no-cache    # Ignore data/cache, always call Claude
+  python -m scripts.generate_seeds --concurrency 3 --rpm 20  # Gentler on rate limits
 """
 
 import argparse
-import json
+import asyncio
+import random
 import sys
 import time
+from collections import defaultdict
 from pathlib import Path
 
+import anthropic
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from backend import jsonutil
 from backend.config import settings
-from backend.services.claude_service import generate_project
+from backend.services import prompt_cache
+from backend.services.claude_service import close_async_client, generate_project_async
 from backend.services.repair_service import auto_fix_project, claude_repair_project
 from backend.quality import fix_cumulative_solutions, validate_project_quality
-from backend.sandbox.executor import execute_code
+from backend.sandbox.pool import start_pool, stop_pool
 
-LESSONS = json.loads(Path("data/lessons.json").read_text())
+LESSONS = jsonutil.loads(Path("data/lessons.json").read_bytes())
 PROJECTS_DIR = Path("data/projects")
 PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
 MAX_RETRIES = 3
+MAX_BACKOFF = 30
 
-TIER_NAMES = {1: "basic", 2: "intermediate", 3: "capstone"}
+# Claude errors a retry can't fix (bad request, auth, missing model)
+FATAL_ERRORS = (
+    anthropic.BadRequestError,
+    anthropic.AuthenticationError,
+    anthropic.PermissionDeniedError,
+    anthropic.NotFoundError,
+)
 
+TIER_NAMES = {1: "basic", 2: "intermediate", 3: "capstone"}
 
-def generate_and_validate(level_id: int, tier: int, concepts: list[str]) -> dict | None:
-    print(f"  Generating Level {level_id} / {TIER_NAMES[tier]}...", end=" ", flush=True)
 
+class RequestBucket:
+    """Token bucket spacing Claude requests out across all concurrent tasks.
+
+    Starts full so the first burst goes out immediately, then refills at
+    `per_minute` requests per minute — staying under the account's rate limit
+    up front instead of retrying after 429s.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def retry_delay(attempt: int, error: Exception) -> float:
+    """Seconds to wait after a failed request: the server's retry-after on a
+    429, otherwise exponential backoff with jitter so tasks don't retry in step.
+    """
+    if isinstance(error, anthropic.RateLimitError):
+        try:
+            return float(error.response.headers["retry-after"])
+        except (KeyError, ValueError):
+            pass
+    return min(MAX_BACKOFF, 2 ** attempt) * random.uniform(0.8, 1.2)
+
+
+async def generate_and_validate(
+    level_id: int,
+    tier: int,
+    concepts: list[str],
+    bucket: RequestBucket,
+    draft: dict | None = None,
+) -> dict | None:
+    """Generate, validate and repair a project, regenerating on failure.
+
+    `draft` is a project taken from the prompt cache for the first attempt;
+    retries always call Claude again. Sandbox runs and the (sync) repair
+    calls go to worker threads so other projects keep progressing.
+
+    A project that fails validation is regenerated right away (the bucket
+    already paces requests); only request errors back off before retrying.
+    """
+    label = f"[L{level_id} {TIER_NAMES[tier]}]"
+
+    def log(message: str):
+        print(f"  {label} {message}", flush=True)
+
+    log("Generating...")
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            project = generate_project(
-                level_id=level_id,
-                tier=tier,
-                concepts=concepts,
-            )
+            if attempt == 1 and draft is not None:
+                project = draft
+            else:
+                await bucket.acquire()
+                project = await generate_project_async(
+                    level_id=level_id,
+                    tier=tier,
+                    concepts=concepts,
+                )
             if not project:
-                print(f"(empty response, retry {attempt})", end=" ", flush=True)
+                log(f"empty response, retry {attempt}")
                 continue
 
             fix_cumulative_solutions(project)
@@ -55,56 +135,109 @@ def generate_and_validate(level_id: int, tier: int, concepts: list[str]) -> dict
             )
             project["is_generated"] = False  # Treat seeds as hand-crafted
 
-            # Validate: execute full solution
-            last_step = project["steps"][-1] if project["steps"] else {}
-            mock_inputs = last_step.get("mock_inputs", [])
-            result = execute_code(project["full_solution"], mock_inputs)
+            # Quality checks; the last step's run is the full solution
+            quality_errors, result = await asyncio.to_thread(validate_project_quality, project)
 
-            if not result["success"]:
-                print(f"(code error, retry {attempt}): {result['error'][:60]}", end=" ", flush=True)
-                time.sleep(1)
+            if result is not None and not result["success"]:
+                log(f"code error, retry {attempt}: {result['error'][:60]}")
                 continue
 
-            # Quality checks
-            quality_errors = validate_project_quality(project)
             if not quality_errors:
-                print(f"OK ({len(project['steps'])} steps)")
+                log(f"OK ({len(project['steps'])} steps)")
                 return project
 
             # Phase 1: programmatic fixes
-            print(f"(repairing, attempt {attempt})...", end=" ", flush=True)
-            project, remaining = auto_fix_project(project, quality_errors)
+            log(f"repairing, attempt {attempt}...")
+            project, remaining = await asyncio.to_thread(auto_fix_project, project, quality_errors)
 
             # Phase 2: up to 2 Claude repair attempts
             for repair_attempt in range(2):
                 if not remaining:
                     break
-                print(f"(claude repair {repair_attempt + 1})...", end=" ", flush=True)
-                repaired = claude_repair_project(project, remaining)
+                log(f"claude repair {repair_attempt + 1}...")
+                await bucket.acquire()
+                repaired = await asyncio.to_thread(claude_repair_project, project, remaining)
                 if not repaired:
                     break
                 project = repaired
-                remaining = validate_project_quality(project)
+                remaining, _ = await asyncio.to_thread(validate_project_quality, project)
 
             if not remaining:
-                print(f"OK — repaired ({len(project['steps'])} steps)")
+                log(f"OK — repaired ({len(project['steps'])} steps)")
                 return project
 
             # Still broken — log errors and fall through to full regen
-            print(f"(repair failed, retry {attempt}):", flush=True)
+            log(f"repair failed, retry {attempt}:")
             for err in remaining[:3]:
                 print(f"    - {err}")
-            time.sleep(1)
 
-        except Exception as e:
-            print(f"(exception, retry {attempt}): {str(e)[:60]}", end=" ", flush=True)
+        except FATAL_ERRORS as e:
+            log(f"request rejected, not retrying: {str(e)[:60]}")
+            return None
 
-        time.sleep(1)
+        except Exception as e:
+            log(f"exception, retry {attempt}: {str(e)[:60]}")
+            if attempt < MAX_RETRIES:
+                await asyncio.sleep(retry_delay(attempt, e))
 
-    print("FAILED after retries")
+    log("FAILED after retries")
     return None
 
 
+async def generate_all(todo: list[tuple[dict, int, list[Path]]], args) -> list[bool]:
+    """Run every (lesson, tier, old_files) pipeline concurrently, bounded by --concurrency."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    bucket = RequestBucket(args.rpm)
+
+    async def run(lesson: dict, tier: int, old_files: list[Path]) -> bool:
+        async with semaphore:
+            return await generate_one(lesson, tier, old_files, bucket, args)
+
+    try:
+        return await asyncio.gather(*(run(*item) for item in todo))
+    finally:
+        await close_async_client()
+
+
+async def generate_one(
+    lesson: dict, tier: int, old_files: list[Path], bucket: RequestBucket, args
+) -> bool:
+    """Generate and save one project; returns whether it succeeded.
+
+    old_files are the existing files for this level and tier, removed on
+    success under --force.
+    """
+    level_id = lesson["id"]
+    prefix = f"level{level_id}_{TIER_NAMES[tier]}"
+    key = prompt_cache.cache_key(level_id, tier, lesson["concepts"])
+
+    # A project already validated for the same prompt needs no new draft,
+    # unless --force asked for a fresh one (which still refreshes the cache)
+    draft = None if (args.no_cache or args.force) else prompt_cache.get(key)
+
+    project = await generate_and_validate(
+        level_id, tier, lesson["concepts"], bucket, draft=draft
+    )
+    if not project:
+        return False
+
+    project["id"] = f"{prefix}_{project['id'].split('_')[-1]}"
+    filename = f"{project['id']}.json"
+    filepath = PROJECTS_DIR / filename
+
+    # If --force, remove old file first
+    if args.force:
+        for old in old_files:
+            old.unlink(missing_ok=True)
+            print(f"    Removed: {old.name}")
+
+    filepath.write_text(jsonutil.dumps(project, indent=True), encoding="utf-8")
+    print(f"    Saved: {filename}")
+    if not args.no_cache:
+        prompt_cache.put(key, project)
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate seed projects")
     parser.add_argument(
@@ -119,6 +252,19 @@ def main():
         "--force", action="store_true",
         help="Regenerate even if project file already exists"
     )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Don't reuse or store validated projects in data/cache"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=5,
+        help="How many projects to generate at once (default 5)"
+    )
+    parser.add_argument(
+        "--rpm", type=int, default=settings.claude_rpm,
+        help="Cap on Claude requests per minute across all projects "
+        "(default MIMO_CLAUDE_RPM, or 50)"
+    )
     args = parser.parse_args()
 
     if not settings.claude_api_key:
@@ -136,54 +282,43 @@ def main():
     # Filter tiers
     tiers = args.tier or [1, 2, 3]
 
-    existing = {p.stem for p in PROJECTS_DIR.glob("*.json")}
+    # Existing files indexed by their "level{id}_{tier}" prefix, scanned once
+    existing: dict[str, list[Path]] = defaultdict(list)
+    existing_count = 0
+    for path in PROJECTS_DIR.glob("*.json"):
+        existing["_".join(path.stem.split("_", 2)[:2])].append(path)
+        existing_count += 1
 
     level_ids = [l["id"] for l in lessons]
     tier_labels = [TIER_NAMES[t] for t in tiers]
     print(f"Levels: {level_ids}")
     print(f"Tiers:  {tier_labels}")
     print(f"Force:  {args.force}")
-    print(f"Found {len(existing)} existing project files")
+    print(f"Found {existing_count} existing project files")
     print()
 
-    generated = 0
-    failed = 0
+    todo = []
     skipped = 0
-
     for lesson in lessons:
-        level_id = lesson["id"]
-        concepts = lesson["concepts"]
-        print(f"Level {level_id}: {lesson['name']}")
-
         for tier in tiers:
-            prefix = f"level{level_id}_{TIER_NAMES[tier]}"
-            if not args.force and any(e.startswith(prefix) for e in existing):
-                print(f"  Skipping {prefix} (already exists)")
-                skipped += 1
-                continue
-
-            project = generate_and_validate(level_id, tier, concepts)
-            if project:
-                project["id"] = f"level{level_id}_{TIER_NAMES[tier]}_{project['id'].split('_')[-1]}"
-                filename = f"{project['id']}.json"
-                filepath = PROJECTS_DIR / filename
-
-                # If --force, remove old file first
-                if args.force:
-                    for old in PROJECTS_DIR.glob(f"{prefix}*.json"):
-                        old.unlink()
-                        print(f"    Removed: {old.name}")
-
-                filepath.write_text(json.dumps(project, indent=2))
-                print(f"    Saved: {filename}")
-                generated += 1
+            old_files = existing.get(f"level{lesson['id']}_{TIER_NAMES[tier]}", [])
+            if args.force or not old_files:
+                todo.append((lesson, tier, old_files))
             else:
-                failed += 1
-
-            time.sleep(0.5)
+                print(f"  Skipping level{lesson['id']}_{TIER_NAMES[tier]} (already exists)")
+                skipped += 1
 
-        print()
+    print(f"Generating {len(todo)} project(s), up to {args.concurrency} at a time...")
+    # Validation and repair run every step's code, often many times over
+    start_pool()
+    try:
+        results = asyncio.run(generate_all(todo, args))
+    finally:
+        stop_pool()
 
+    generated = sum(results)
+    failed = len(results) - generated
+    print()
     print(f"Done. Generated: {generated}, Skipped: {skipped}, Failed: {failed}")
 
 
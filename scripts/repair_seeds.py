@@ -7,25 +7,147 @@ Usage:
   python -m scripts.repair_seeds              # Repair all projects with issues
   python -m scripts.repair_seeds --dry-run    # Show what would be fixed, don't save
   python -m scripts.repair_seeds --level 1    # Only repair level 1 projects
+  python -m scripts.repair_seeds --jobs 1     # One project at a time
+  python -m scripts.repair_seeds --no-cache   # Re-check projects that passed before
 """
 
 import argparse
-import json
+import hashlib
 import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from backend import jsonutil, quality
+from backend.sandbox import executor, pool
 from backend.quality import validate_project_quality, fix_cumulative_solutions
+from backend.sandbox.pool import start_pool, stop_pool
 from backend.services.repair_service import auto_fix_project, claude_repair_project
 
 PROJECTS_DIR = Path("data/projects")
 
+# Digests of project files that last passed validation. Most projects are
+# unchanged between runs, and validating one runs every step in the sandbox.
+CLEAN_CACHE = Path("data/cache/repair_validation.json")
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+# Whether a project passes depends on the checks and on how its code is run
+# (seeding, environment), so a change to any of these invalidates every pass
+_VALIDATOR_SOURCES = (
+    Path(quality.__file__),
+    Path(executor.__file__),
+    Path(pool.__file__),
+    Path(pool.__file__).parent / "site" / "sitecustomize.py",
+)
+
+
+def _validator_digest() -> str:
+    return _digest(b"".join(path.read_bytes() for path in _VALIDATOR_SOURCES))
+
+
+def load_clean_cache() -> set[str]:
+    try:
+        cache = jsonutil.loads(CLEAN_CACHE.read_bytes())
+    except (FileNotFoundError, jsonutil.JSONDecodeError):
+        return set()
+    if cache.get("validator") != _validator_digest():
+        return set()
+    return set(cache.get("clean", []))
+
+
+def save_clean_cache(clean: set[str]):
+    CLEAN_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename, as in prompt_cache
+    tmp = CLEAN_CACHE.with_suffix(".tmp")
+    tmp.write_text(
+        jsonutil.dumps({"validator": _validator_digest(), "clean": sorted(clean)}),
+        encoding="utf-8",
+    )
+    tmp.replace(CLEAN_CACHE)
+
+
+def repair_one(path: Path, dry_run: bool) -> tuple[str, list[str]]:
+    """Check and repair one project file.
+
+    Returns its outcome ("clean", "auto_fixed", "claude_fixed" or
+    "still_broken") and the report lines to print for it. Lines are
+    collected rather than printed so concurrent repairs don't interleave.
+    """
+    lines = []
+    project = jsonutil.loads(path.read_bytes())
+    errors, _ = validate_project_quality(project)
+
+    if not errors:
+        return "clean", lines
+
+    lines.append(f"{path.stem}: {len(errors)} issue(s)")
+    for err in errors:
+        lines.append(f"  - {err}")
+
+    if dry_run:
+        lines.append("")
+        return "still_broken", lines
+
+    # Phase 1: programmatic fixes
+    project, remaining = auto_fix_project(project, errors)
+    if not remaining:
+        # Rebuild full_solution after fixes
+        project["full_solution"] = "\n".join(
+            step["solution"] for step in project["steps"]
+        )
+        path.write_text(jsonutil.dumps(project, indent=True), encoding="utf-8")
+        lines.append(f"  -> Auto-fixed!\n")
+        return "auto_fixed", lines
+
+    lines.append(f"  -> {len(remaining)} issue(s) remain after auto-fix")
+
+    # Phase 2: up to 2 Claude repair attempts
+    for attempt in range(2):
+        line = f"  -> Claude repair attempt {attempt + 1}... "
+        repaired = claude_repair_project(project, remaining)
+        if not repaired:
+            lines.append(line + "failed (no response)")
+            break
+        project = repaired
+        remaining, _ = validate_project_quality(project)
+        if not remaining:
+            lines.append(line + "success!")
+            break
+        lines.append(line + f"{len(remaining)} issue(s) remain")
+
+    if not remaining:
+        project["full_solution"] = "\n".join(
+            step["solution"] for step in project["steps"]
+        )
+        path.write_text(jsonutil.dumps(project, indent=True), encoding="utf-8")
+        lines.append(f"  -> Claude-fixed!\n")
+        return "claude_fixed", lines
+
+    lines.append(f"  -> Still broken after repair:")
+    for err in remaining[:3]:
+        lines.append(f"     - {err}")
+    lines.append("")
+    return "still_broken", lines
+
 
 def main():
     parser = argparse.ArgumentParser(description="Repair existing seed projects")
     parser.add_argument("--dry-run", action="store_true", help="Show issues without fixing")
     parser.add_argument("--level", type=int, nargs="+", help="Only repair these level(s)")
+    parser.add_argument(
+        "--jobs", type=int, default=4,
+        help="How many projects to check and repair at once (default 4)"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help=f"Re-validate every project, ignoring {CLEAN_CACHE}"
+    )
     args = parser.parse_args()
 
     project_files = sorted(PROJECTS_DIR.glob("*.json"))
@@ -35,73 +157,39 @@ def main():
             if any(p.stem.startswith(f"level{l}_") for l in args.level)
         ]
 
-    print(f"Checking {len(project_files)} projects...\n")
-
-    clean = 0
-    auto_fixed = 0
-    claude_fixed = 0
-    still_broken = 0
-
+    clean = set() if args.no_cache else load_clean_cache()
+    counts = Counter()
+    to_check = []
     for path in project_files:
-        project = json.loads(path.read_text())
-        errors = validate_project_quality(project)
-
-        if not errors:
-            clean += 1
-            continue
-
-        print(f"{path.stem}: {len(errors)} issue(s)")
-        for err in errors:
-            print(f"  - {err}")
-
-        if args.dry_run:
-            print()
-            still_broken += 1
-            continue
-
-        # Phase 1: programmatic fixes
-        project, remaining = auto_fix_project(project, errors)
-        if not remaining:
-            # Rebuild full_solution after fixes
-            project["full_solution"] = "\n".join(
-                step["solution"] for step in project["steps"]
-            )
-            path.write_text(json.dumps(project, indent=2))
-            print(f"  -> Auto-fixed!\n")
-            auto_fixed += 1
-            continue
-
-        print(f"  -> {len(remaining)} issue(s) remain after auto-fix")
-
-        # Phase 2: up to 2 Claude repair attempts
-        for attempt in range(2):
-            print(f"  -> Claude repair attempt {attempt + 1}...", end=" ", flush=True)
-            repaired = claude_repair_project(project, remaining)
-            if not repaired:
-                print("failed (no response)")
-                break
-            project = repaired
-            remaining = validate_project_quality(project)
-            if not remaining:
-                print("success!")
-                break
-            print(f"{len(remaining)} issue(s) remain")
-
-        if not remaining:
-            project["full_solution"] = "\n".join(
-                step["solution"] for step in project["steps"]
-            )
-            path.write_text(json.dumps(project, indent=2))
-            print(f"  -> Claude-fixed!\n")
-            claude_fixed += 1
+        if _digest(path.read_bytes()) in clean:
+            counts["clean"] += 1
         else:
-            print(f"  -> Still broken after repair:")
-            for err in remaining[:3]:
-                print(f"     - {err}")
-            print()
-            still_broken += 1
-
-    print(f"Results: {clean} clean, {auto_fixed} auto-fixed, {claude_fixed} claude-fixed, {still_broken} still broken")
+            to_check.append(path)
+
+    print(f"Checking {len(to_check)} projects ({counts['clean']} unchanged since passing)...\n")
+    # Workers exit on their own if we die before stop_pool()
+    start_pool()
+
+    # Each project is independent, and the work is waiting on the sandbox
+    # or Claude, so threads overlap it. Reports print in file order.
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as workers:
+            for path, (status, lines) in zip(to_check, workers.map(
+                lambda path: repair_one(path, args.dry_run), to_check
+            )):
+                counts[status] += 1
+                if status != "still_broken":
+                    # Fixed projects were re-validated before being saved
+                    clean.add(_digest(path.read_bytes()))
+                for line in lines:
+                    print(line)
+    finally:
+        stop_pool()
+    save_clean_cache(clean)
+    print(
+        f"Results: {counts['clean']} clean, {counts['auto_fixed']} auto-fixed, "
+        f"{counts['claude_fixed']} claude-fixed, {counts['still_broken']} still broken"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+"""Tests for the JSON response class and the hint request path."""
+
+import asyncio
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api import generation
+from backend.api.responses import RawJSON, RawJSONResponse
+from backend.config import settings
+from backend.services import hint_batcher
+from backend.services.hint_batcher import HintBatcher
+
+
+# ---------------------------------------------------------------------------
+# RawJSONResponse
+# ---------------------------------------------------------------------------
+
+
+class TestRawJSONResponse:
+    def test_raw_json_is_spliced_verbatim(self):
+        body = RawJSONResponse({"steps": RawJSON('[{"step_num": 1}]')}).body
+        assert body == b'{"steps":[{"step_num": 1}]}'
+
+    def test_nested_raw_json(self):
+        content = {"projects": [{"id": "p1", "goals": RawJSON('["a","b"]')}]}
+        assert orjson.loads(RawJSONResponse(content).body) == {
+            "projects": [{"id": "p1", "goals": ["a", "b"]}]
+        }
+
+    def test_plain_content_matches_orjson(self):
+        content = {"a": 1, "b": [True, None, 1.5], "c": {"d": "é"}}
+        assert RawJSONResponse(content).body == orjson.dumps(content)
+
+    def test_non_str_keys(self):
+        assert orjson.loads(RawJSONResponse({1: "x"}).body) == {"1": "x"}
+
+    def test_other_subclasses_serialize_as_their_base_type(self):
+        class Name(str):
+            pass
+
+        class Count(int):
+            pass
+
+        class Mapping(dict):
+            pass
+
+        content = Mapping(name=Name("ada"), count=Count(3), items=(1, 2))
+        assert orjson.loads(RawJSONResponse(content).body) == {
+            "name": "ada", "count": 3, "items": [1, 2]
+        }
+
+    def test_unserializable_raises(self):
+        with pytest.raises(TypeError):
+            RawJSONResponse({"x": object()})
+
+
+# ---------------------------------------------------------------------------
+# HintBatcher
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def claude_calls(monkeypatch):
+    """Stub the Claude hint calls, recording what each one was asked."""
+    calls = {"batch": [], "single": []}
+
+    async def fake_batch(items):
+        calls["batch"].append(list(items))
+        return [f"batch hint for {code}" for _, code, _ in items]
+
+    async def fake_single(instruction, code, error=None):
+        calls["single"].append(code)
+        return f"hint for {code}"
+
+    monkeypatch.setattr(hint_batcher, "generate_hints_batch_async", fake_batch)
+    monkeypatch.setattr(hint_batcher, "generate_hint_async", fake_single)
+    return calls
+
+
+async def _ask(batcher: HintBatcher, codes: list[str]) -> list:
+    return await asyncio.gather(
+        *(batcher.get_hint("Print it", code) for code in codes),
+        return_exceptions=True,
+    )
+
+
+class TestHintBatcher:
+    def test_concurrent_requests_share_one_call(self, claude_calls):
+        hints = asyncio.run(_ask(HintBatcher(max_delay=0.01), ["a", "b", "c"]))
+        assert hints == ["batch hint for a", "batch hint for b", "batch hint for c"]
+        assert len(claude_calls["batch"]) == 1
+        assert claude_calls["single"] == []
+
+    def test_lone_request_uses_single_call(self, claude_calls):
+        hints = asyncio.run(_ask(HintBatcher(max_delay=0.01), ["a"]))
+        assert hints == ["hint for a"]
+        assert claude_calls["batch"] == []
+
+    def test_full_batch_flushes_without_waiting(self, claude_calls):
+        async def run():
+            batcher = HintBatcher(max_batch_size=2, max_delay=60)
+            return await asyncio.wait_for(_ask(batcher, ["a", "b"]), timeout=5)
+
+        assert asyncio.run(run()) == ["batch hint for a", "batch hint for b"]
+
+    def test_oversized_burst_is_split(self, claude_calls):
+        asyncio.run(_ask(HintBatcher(max_batch_size=2, max_delay=0.01), ["a", "b", "c"]))
+        assert [len(batch) for batch in claude_calls["batch"]] == [2]
+        assert claude_calls["single"] == ["c"]
+
+    def test_failed_batch_falls_back_per_item(self, claude_calls, monkeypatch):
+        async def broken_batch(items):
+            raise ValueError("malformed")
+
+        monkeypatch.setattr(hint_batcher, "generate_hints_batch_async", broken_batch)
+        hints = asyncio.run(_ask(HintBatcher(max_delay=0.01), ["a", "b"]))
+        assert hints == ["hint for a", "hint for b"]
+
+    def test_single_failure_only_reaches_its_caller(self, claude_calls, monkeypatch):
+        async def no_batch(items):
+            return None
+
+        async def flaky_single(instruction, code, error=None):
+            if code == "bad":
+                raise RuntimeError("overloaded")
+            return f"hint for {code}"
+
+        monkeypatch.setattr(hint_batcher, "generate_hints_batch_async", no_batch)
+        monkeypatch.setattr(hint_batcher, "generate_hint_async", flaky_single)
+        good, bad = asyncio.run(_ask(HintBatcher(max_delay=0.01), ["good", "bad"]))
+        assert good == "hint for good"
+        assert isinstance(bad, RuntimeError)
+
+
+# ---------------------------------------------------------------------------
+# /generate/hint and its TTL cache
+# ---------------------------------------------------------------------------
+
+
+class _CountingBatcher:
+    def __init__(self):
+        self.calls = 0
+
+    async def get_hint(self, instruction, code, error=None):
+        self.calls += 1
+        return f"hint {self.calls} for {code}"
+
+
+@pytest.fixture
+def hint_client(monkeypatch):
+    monkeypatch.setattr(settings, "claude_api_key", "test-key")
+    monkeypatch.setattr(generation, "_hint_cache", type(generation._hint_cache)(maxsize=10, ttl=60))
+    app = FastAPI(default_response_class=RawJSONResponse)
+    app.include_router(generation.router, prefix="/api/v1")
+    app.state.hint_batcher = _CountingBatcher()
+    with TestClient(app) as client:
+        yield client, app.state.hint_batcher
+
+
+def _hint(client, code="print(x)", error="NameError"):
+    return client.post(
+        "/api/v1/generate/hint",
+        json={"instruction": "Print x", "code": code, "error": error},
+    )
+
+
+class TestHintEndpoint:
+    def test_miss_then_hit(self, hint_client):
+        client, batcher = hint_client
+        first = _hint(client)
+        second = _hint(client)
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert first.json() == second.json() == {"hint": "hint 1 for print(x)"}
+        assert batcher.calls == 1
+
+    def test_key_covers_code_and_error(self, hint_client):
+        client, batcher = hint_client
+        _hint(client)
+        assert _hint(client, code="print(y)").headers["X-Cache"] == "MISS"
+        assert _hint(client, error="TypeError").headers["X-Cache"] == "MISS"
+        assert _hint(client, error=None).headers["X-Cache"] == "MISS"
+        assert batcher.calls == 4
+
+    def test_without_api_key(self, hint_client, monkeypatch):
+        client, batcher = hint_client
+        monkeypatch.setattr(settings, "claude_api_key", "")
+        assert "hint" in _hint(client).json()
+        assert batcher.calls == 0
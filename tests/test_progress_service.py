@@ -0,0 +1,188 @@
+"""Tests for progress upserts, completion checks and the progress migration."""
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from backend.services.progress_service import (
+    _any_project_complete,
+    bulk_mark_completed,
+    completion_upsert,
+)
+from backend.storage import database
+from backend.storage.database import Progress, Project
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/test.db")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+
+def _project(project_id: str, total_steps: int) -> Project:
+    return Project(
+        id=project_id,
+        level_id=1,
+        tier=1,
+        name=project_id,
+        description="",
+        learning_goals="[]",
+        concepts_used="[]",
+        total_lines=1,
+        steps="[]",
+        total_steps_count=total_steps,
+        full_solution="",
+    )
+
+
+def _rows(session, user_id="u1", project_id="p1") -> dict[int, Progress]:
+    session.expire_all()
+    rows = session.exec(
+        select(Progress).where(Progress.user_id == user_id, Progress.project_id == project_id)
+    ).all()
+    return {row.step_num: row for row in rows}
+
+
+# ---------------------------------------------------------------------------
+# completion_upsert / bulk_mark_completed
+# ---------------------------------------------------------------------------
+
+
+class TestCompletionUpsert:
+    def test_inserts_new_rows(self, session):
+        session.exec(completion_upsert("u1", "p1", [1, 2], {1: "print(1)", 2: "print(2)"}))
+        session.commit()
+        rows = _rows(session)
+        assert sorted(rows) == [1, 2]
+        assert all(row.completed and row.completed_at for row in rows.values())
+        assert rows[2].code == "print(2)"
+
+    def test_updates_existing_row_in_place(self, session):
+        session.add(Progress(user_id="u1", project_id="p1", step_num=1, code="old"))
+        session.commit()
+        session.exec(completion_upsert("u1", "p1", [1], {1: "new"}))
+        session.commit()
+        rows = _rows(session)
+        assert len(rows) == 1
+        assert rows[1].completed
+        assert rows[1].code == "new"
+
+    def test_without_codes_keeps_existing_code(self, session):
+        session.add(Progress(user_id="u1", project_id="p1", step_num=1, code="kept"))
+        session.commit()
+        session.exec(completion_upsert("u1", "p1", [1, 2]))
+        session.commit()
+        rows = _rows(session)
+        assert rows[1].code == "kept"
+        assert rows[2].code == ""
+        assert rows[1].completed and rows[2].completed
+
+    def test_other_users_are_untouched(self, session):
+        session.exec(completion_upsert("u1", "p1", [1]))
+        session.exec(completion_upsert("u2", "p1", [1], {1: "theirs"}))
+        session.commit()
+        assert _rows(session, "u1")[1].code == ""
+        assert _rows(session, "u2")[1].code == "theirs"
+
+
+class TestBulkMarkCompleted:
+    def test_marks_every_step(self, session):
+        bulk_mark_completed("u1", "p1", [1, 2, 3], session)
+        assert sorted(_rows(session)) == [1, 2, 3]
+
+    def test_repeat_is_idempotent(self, session):
+        bulk_mark_completed("u1", "p1", [1, 2], session)
+        bulk_mark_completed("u1", "p1", [2, 3], session)
+        assert sorted(_rows(session)) == [1, 2, 3]
+
+    def test_no_steps_is_a_no_op(self, session):
+        bulk_mark_completed("u1", "p1", [], session)
+        assert _rows(session) == {}
+
+
+# ---------------------------------------------------------------------------
+# _any_project_complete
+# ---------------------------------------------------------------------------
+
+
+class TestAnyProjectComplete:
+    @pytest.fixture
+    def projects(self, session):
+        projects = [_project("p1", 3), _project("p2", 2)]
+        session.add_all(projects)
+        session.commit()
+        return projects
+
+    def test_no_projects(self, session):
+        assert not _any_project_complete([], "u1", session)
+
+    def test_no_progress(self, session, projects):
+        assert not _any_project_complete(projects, "u1", session)
+
+    def test_partial_progress(self, session, projects):
+        bulk_mark_completed("u1", "p1", [1, 2], session)
+        bulk_mark_completed("u1", "p2", [1], session)
+        assert not _any_project_complete(projects, "u1", session)
+
+    def test_one_project_complete(self, session, projects):
+        bulk_mark_completed("u1", "p2", [1, 2], session)
+        assert _any_project_complete(projects, "u1", session)
+
+    def test_incomplete_rows_do_not_count(self, session, projects):
+        session.add(Progress(user_id="u1", project_id="p2", step_num=1, completed=False))
+        session.commit()
+        bulk_mark_completed("u1", "p2", [2], session)
+        assert not _any_project_complete(projects, "u1", session)
+
+    def test_other_users_progress_does_not_count(self, session, projects):
+        bulk_mark_completed("u2", "p2", [1, 2], session)
+        assert not _any_project_complete(projects, "u1", session)
+
+
+def test_project_requires_total_steps_count(session):
+    project = _project("p1", 1)
+    project.total_steps_count = None
+    session.add(project)
+    with pytest.raises(Exception, match="NOT NULL"):
+        session.commit()
+
+
+# ---------------------------------------------------------------------------
+# _ensure_indexes migration
+# ---------------------------------------------------------------------------
+
+
+def test_ensure_indexes_collapses_duplicate_progress_rows(engine, monkeypatch):
+    """Old databases may hold duplicates that block the unique index."""
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_progress_user_project_step"))
+        conn.execute(text(
+            "INSERT INTO progress (user_id, project_id, step_num, completed, code) VALUES "
+            "('u1', 'p1', 1, 0, 'first'), "
+            "('u1', 'p1', 1, 1, 'latest'), "
+            "('u1', 'p1', 2, 1, 'only'), "
+            "('u2', 'p1', 1, 1, 'other user')"
+        ))
+
+    monkeypatch.setattr(database, "engine", engine)
+    database._ensure_indexes()
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT user_id, step_num, code FROM progress ORDER BY user_id, step_num"
+        )).all()
+        indexes = {row[1] for row in conn.execute(text("PRAGMA index_list(progress)"))}
+    # The newest row (highest id) per (user, project, step) survives
+    assert rows == [("u1", 1, "latest"), ("u1", 2, "only"), ("u2", 1, "other user")]
+    assert "ix_progress_user_project_step" in indexes
+
+    # Running it again is a no-op
+    database._ensure_indexes()
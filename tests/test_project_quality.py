@@ -4,30 +4,52 @@ Validates structural integrity, solution execution, instruction quality,
 and consistency across all project JSON files.
 """
 
-import json
+import ast
+import bisect
+import builtins
+import contextlib
+import functools
+import io
 import os
+import random
 import re
-import subprocess
-import tempfile
+import signal
+import traceback
+from itertools import zip_longest
 from pathlib import Path
 
 import pytest
 
+from backend import jsonutil
 from backend.quality import VAGUE_PATTERNS
 
 # Path to project data
 DATA_DIR = Path(__file__).parent.parent / "data" / "projects"
 
+_INPUT_RE = re.compile(r"\binput\s*\(")
+_SINGLE_QUOTED_RE = re.compile(r"'([^']*)'")
+_APOST_INNER_RE = re.compile(r"[a-zA-Z]'[a-zA-Z]")
 
-def get_project_files():
-    """Collect all project JSON file paths."""
-    return sorted(DATA_DIR.glob("*.json"))
+
+@functools.lru_cache(maxsize=1)
+def get_project_files() -> tuple[Path, ...]:
+    """Collect all project JSON file paths, scanning the directory once."""
+    with os.scandir(DATA_DIR) as entries:
+        return tuple(sorted(
+            Path(entry.path) for entry in entries
+            if entry.name.endswith(".json") and entry.is_file()
+        ))
 
 
 def load_project(path: Path) -> dict:
     """Load and parse a project JSON file."""
-    with open(path) as f:
-        return json.load(f)
+    return jsonutil.loads(path.read_bytes())
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_load(project_id: str) -> dict:
+    """Load a project once per test process; tests must not mutate the result."""
+    return load_project(DATA_DIR / f"{project_id}.json")
 
 
 @pytest.fixture(scope="session")
@@ -35,7 +57,7 @@ def all_projects():
     """Load all projects once for the test session."""
     projects = {}
     for path in get_project_files():
-        projects[path.stem] = load_project(path)
+        projects[path.stem] = _cached_load(path.stem)
     return projects
 
 
@@ -44,57 +66,133 @@ def project_ids():
     return [p.stem for p in get_project_files()]
 
 
+def project_step_ids():
+    """Return (file_stem, step_num) pairs, one test per step for parametrize."""
+    return [
+        pytest.param(path.stem, step["step_num"], id=f"{path.stem}-step{step['step_num']}")
+        for path in get_project_files()
+        for step in _cached_load(path.stem)["steps"]
+    ]
+
+
+# Computed once at import and shared by every parametrized class
+_PROJECT_IDS = project_ids()
+
+
+@functools.lru_cache(maxsize=None)
+def _parsed(code: str) -> ast.Module | None:
+    """Parse code once per test process, or None if it isn't valid Python."""
+    try:
+        return ast.parse(code)
+    except SyntaxError:
+        return None
+
+
+def _apostrophe_in_single_quotes(segment: str) -> bool:
+    """Whether a string literal's source is single-quoted around an apostrophe.
+
+    Checks the source rather than the value, so an escaped \\' is left alone.
+    """
+    body = segment.lstrip("rRbBuUfF")
+    if not body.startswith("'") or body.startswith("'''"):
+        return False
+    return bool(_APOST_INNER_RE.search(body[1:-1]))
+
+
+@functools.lru_cache(maxsize=None)
+def _scan_steps(project_id: str) -> list[tuple[int, list[str]]]:
+    """Per step: its input() call count and its apostrophe-carrying strings.
+
+    Step solutions are often fragments (an indented loop body on its own),
+    so the joined program is parsed once and every node is attributed to
+    the step whose lines it starts on. If the program doesn't parse, fall
+    back to scanning each step's source with the regexes.
+    """
+    steps = _cached_load(project_id)["steps"]
+    results = [(0, []) for _ in steps]
+    code = "\n".join(step["solution"] for step in steps)
+    tree = _parsed(code)
+    if tree is None:
+        for i, step in enumerate(steps):
+            results[i] = (
+                len(_INPUT_RE.findall(step["solution"])),
+                [
+                    match.group() for match in _SINGLE_QUOTED_RE.finditer(step["solution"])
+                    if _APOST_INNER_RE.search(match.group(1))
+                ],
+            )
+        return results
+
+    # First line (1-based) of each step in the joined program
+    starts = []
+    line = 1
+    for step in steps:
+        starts.append(line)
+        line += step["solution"].count("\n") + 1
+
+    seen = set()
+    for node in ast.walk(tree):
+        if id(node) in seen or not hasattr(node, "lineno"):
+            continue
+        i = bisect.bisect_right(starts, node.lineno) - 1
+        count, strings = results[i]
+        if isinstance(node, ast.Call) and getattr(node.func, "id", None) == "input":
+            results[i] = (count + 1, strings)
+        elif isinstance(node, ast.JoinedStr) or (
+            isinstance(node, ast.Constant) and isinstance(node.value, str)
+        ):
+            if isinstance(node, ast.JoinedStr):
+                # The f-string is checked as a whole, not part by part
+                seen.update(id(sub) for sub in ast.walk(node))
+            segment = ast.get_source_segment(code, node) or ""
+            if _apostrophe_in_single_quotes(segment):
+                strings.append(segment)
+    return results
+
+
 # ---------------------------------------------------------------------------
 # A. Structural Validation
 # ---------------------------------------------------------------------------
 
 
-@pytest.mark.parametrize("project_id", project_ids())
+@pytest.mark.parametrize("project_id", _PROJECT_IDS)
 class TestStructuralValidation:
-    """Validate required keys, types, and value ranges."""
+    """Validate required keys, types, and value ranges.
 
-    def _load(self, project_id):
-        return load_project(DATA_DIR / f"{project_id}.json")
+    The checks are each microseconds of work, so they run as one test per
+    project and report every problem found together.
+    """
 
-    def test_required_top_level_keys(self, project_id):
-        proj = self._load(project_id)
+    def test_structure(self, project_id):
+        proj = _cached_load(project_id)
         required = {"id", "level_id", "tier", "name", "steps", "full_solution"}
         missing = required - set(proj.keys())
         assert not missing, f"Missing top-level keys: {missing}"
 
-    def test_level_id_range(self, project_id):
-        proj = self._load(project_id)
-        assert 1 <= proj["level_id"] <= 9, f"level_id {proj['level_id']} out of range 1-9"
+        errors = []
+        if not 1 <= proj["level_id"] <= 9:
+            errors.append(f"level_id {proj['level_id']} out of range 1-9")
+        if proj["tier"] not in (1, 2, 3):
+            errors.append(f"tier {proj['tier']} not in (1, 2, 3)")
+        if not proj["steps"]:
+            errors.append("steps is empty")
 
-    def test_tier_range(self, project_id):
-        proj = self._load(project_id)
-        assert proj["tier"] in (1, 2, 3), f"tier {proj['tier']} not in (1, 2, 3)"
-
-    def test_steps_non_empty(self, project_id):
-        proj = self._load(project_id)
-        assert len(proj["steps"]) > 0, "steps is empty"
-
-    def test_step_nums_sequential(self, project_id):
-        proj = self._load(project_id)
-        nums = [s["step_num"] for s in proj["steps"]]
+        nums = [s.get("step_num") for s in proj["steps"]]
         expected = list(range(1, len(nums) + 1))
-        assert nums == expected, f"step_nums {nums} != expected {expected}"
+        if nums != expected:
+            errors.append(f"step_nums {nums} != expected {expected}")
 
-    def test_step_required_keys(self, project_id):
-        proj = self._load(project_id)
-        required = {"step_num", "instruction", "hint", "expected_lines",
-                     "expected_output", "mock_inputs", "solution"}
+        step_required = {"step_num", "instruction", "hint", "expected_lines",
+                         "expected_output", "mock_inputs", "solution"}
         for step in proj["steps"]:
-            missing = required - set(step.keys())
-            assert not missing, f"Step {step.get('step_num', '?')} missing keys: {missing}"
+            step_missing = step_required - set(step.keys())
+            if step_missing:
+                errors.append(f"Step {step.get('step_num', '?')} missing keys: {step_missing}")
+            el = step.get("expected_lines")
+            if el is not None and not 1 <= el <= 5:
+                errors.append(f"Step {step.get('step_num', '?')}: expected_lines={el} out of range 1-5")
 
-    def test_expected_lines_range(self, project_id):
-        proj = self._load(project_id)
-        for step in proj["steps"]:
-            el = step["expected_lines"]
-            assert 1 <= el <= 5, (
-                f"Step {step['step_num']}: expected_lines={el} out of range 1-5"
-            )
+        assert not errors, "\n".join(errors)
 
 
 # ---------------------------------------------------------------------------
@@ -102,80 +200,175 @@ class TestStructuralValidation:
 # ---------------------------------------------------------------------------
 
 
-def _execute_code(code: str, mock_inputs: list[str]) -> dict:
-    """Execute Python code with mocked inputs, return {success, output, error}."""
-    if mock_inputs:
-        inputs_repr = repr(mock_inputs)
-        wrapper = f"""import builtins
-_mock_inputs = {inputs_repr}
-_input_index = 0
-
-def _mock_input(prompt=''):
-    global _input_index
-    if prompt:
-        print(prompt, end='')
-    if _input_index < len(_mock_inputs):
-        val = _mock_inputs[_input_index]
-        _input_index += 1
-        return val
-    return ''
-
-builtins.input = _mock_input
+_SOLUTION_FILENAME = "<solution>"
+_TIMEOUT_ERROR = "Timeout"
+
+
+class _ExecutionTimeout(BaseException):
+    """Raised into solution code on timeout.
+
+    A BaseException, so a seed's `except Exception` retry loop can't
+    swallow it.
+    """
+
+
+def _raise_timeout(signum, frame):
+    # Only raise inside solution code, and keep re-firing until the
+    # exception escapes exec: a bare `except:` can catch any one raise.
+    # _run_in cancels the timer once exec has returned.
+    signal.setitimer(signal.ITIMER_REAL, 0.1)
+    if frame is not None and frame.f_code.co_filename == _SOLUTION_FILENAME:
+        raise _ExecutionTimeout()
 
-"""
-        full_code = wrapper + code
-    else:
-        full_code = code
 
-    with tempfile.NamedTemporaryFile(
-        mode="w", suffix=".py", delete=False, dir="/tmp"
-    ) as f:
-        f.write(full_code)
-        code_path = f.name
+def _new_namespace() -> dict:
+    return {"__name__": "__main__", "__builtins__": builtins}
 
+
+def _run_in(namespace: dict, code, input_fn) -> dict:
+    """exec code (source or a code object) in namespace with input() mocked."""
+    stdout, stderr = io.StringIO(), io.StringIO()
+    real_input = builtins.input
+    builtins.input = input_fn
+    has_alarm = hasattr(signal, "SIGALRM")
+    if has_alarm:
+        old_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.alarm(10)
     try:
-        result = subprocess.run(
-            ["python3", code_path],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-        return {
-            "success": result.returncode == 0,
-            "output": result.stdout,
-            "error": result.stderr,
-        }
-    except subprocess.TimeoutExpired:
-        return {"success": False, "output": "", "error": "Timeout"}
+        if isinstance(code, str):
+            code = compile(code, _SOLUTION_FILENAME, "exec")
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            exec(code, namespace)
+        success = True
+    except _ExecutionTimeout:
+        return {"success": False, "output": "", "error": _TIMEOUT_ERROR}
+    except SystemExit as e:
+        success = e.code in (None, 0)
+    except Exception:
+        stderr.write(traceback.format_exc())
+        success = False
     finally:
-        os.unlink(code_path)
-
+        if has_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, old_handler)
+        builtins.input = real_input
 
-def _normalize(text: str) -> str:
-    """Normalize whitespace for comparison."""
-    lines = text.replace("\r\n", "\n").split("\n")
-    lines = [line.rstrip() for line in lines]
-    while lines and lines[-1] == "":
-        lines.pop()
-    return "\n".join(lines)
+    return {
+        "success": success,
+        "output": stdout.getvalue(),
+        "error": stderr.getvalue(),
+    }
 
 
-@pytest.mark.parametrize("project_id", project_ids())
+def _execute_code(code: str, mock_inputs: list[str]) -> dict:
+    """Execute Python code with mocked inputs, return {success, output, error}.
+
+    Seed solutions are trusted, so they run in this process with exec()
+    rather than paying for a fresh interpreter per step. random is seeded
+    the way the sandbox seeds it.
+    """
+    inputs = iter(mock_inputs)
+
+    def _mock_input(prompt=""):
+        if prompt:
+            print(prompt, end="")
+        return next(inputs, "")
+
+    random.seed(42)
+    return _run_in(_new_namespace(), code, _mock_input)
+
+
+@functools.lru_cache(maxsize=None)
+def _step_results(project_id: str) -> list[dict]:
+    """Result of running each step's accumulated code, computed once per project.
+
+    Each step's solution runs against the namespace the previous steps left
+    behind, so a project costs one pass over its code rather than a re-run
+    from step 1 per step. Output is accumulated to match a full re-run. Once
+    a step can't run that way, it and every later step are re-run from the
+    top instead. That happens when a step doesn't compile alone (it continues
+    a block), its mock_inputs disagree with what was already consumed, an
+    earlier run ran out of mock inputs, or a run failed.
+
+    Steps after one that timed out are marked skipped, not re-run: each
+    re-run would contain the same loop and wait out its own timeout.
+    """
+    steps = _cached_load(project_id)["steps"]
+    results = []
+    namespace = _new_namespace()
+    consumed: list[str] = []
+    output = ""
+    incremental = True
+    timed_out = None
+    random.seed(42)
+
+    for i, step in enumerate(steps):
+        if timed_out is not None:
+            results.append({"skipped": f"step {timed_out} timed out"})
+            continue
+        mock_inputs = step.get("mock_inputs", [])
+        code = None
+        if incremental and mock_inputs[:len(consumed)] == consumed:
+            try:
+                code = compile(step["solution"], _SOLUTION_FILENAME, "exec")
+            except SyntaxError:
+                pass
+        if code is None:
+            incremental = False
+            accumulated_code = "\n".join(s["solution"] for s in steps[:i + 1])
+            results.append(_execute_code(accumulated_code, mock_inputs))
+            if results[-1]["error"] == _TIMEOUT_ERROR:
+                timed_out = step["step_num"]
+            continue
+
+        exhausted = False
+
+        def _mock_input(prompt=""):
+            nonlocal exhausted
+            if prompt:
+                print(prompt, end="")
+            if len(consumed) < len(mock_inputs):
+                consumed.append(mock_inputs[len(consumed)])
+                return consumed[-1]
+            exhausted = True
+            return ""
+
+        result = _run_in(namespace, code, _mock_input)
+        output += result["output"]
+        results.append({**result, "output": output})
+        if exhausted or not result["success"]:
+            incremental = False
+        if result["error"] == _TIMEOUT_ERROR:
+            timed_out = step["step_num"]
+
+    return results
+
+
+def _outputs_equal(a: str, b: str) -> bool:
+    """Compare ignoring trailing whitespace per line and trailing blank lines.
+
+    Lines are compared pairwise as they're walked, without building
+    normalized copies of either side; a missing line counts as blank.
+    """
+    return all(
+        x.rstrip() == y.rstrip()
+        for x, y in zip_longest(a.split("\n"), b.split("\n"), fillvalue="")
+    )
+
+
+@pytest.mark.parametrize("project_id", _PROJECT_IDS)
 class TestSolutionExecution:
     """Validate that project solutions actually run correctly."""
 
-    def _load(self, project_id):
-        return load_project(DATA_DIR / f"{project_id}.json")
-
     def test_full_solution_matches_concatenated_steps(self, project_id):
-        proj = self._load(project_id)
+        proj = _cached_load(project_id)
         concatenated = "\n".join(s["solution"] for s in proj["steps"])
-        assert _normalize(proj["full_solution"]) == _normalize(concatenated), (
+        assert _outputs_equal(proj["full_solution"], concatenated), (
             "full_solution does not match concatenated step solutions"
         )
 
     def test_full_solution_executes(self, project_id):
-        proj = self._load(project_id)
+        proj = _cached_load(project_id)
         last_step = proj["steps"][-1]
         mock_inputs = last_step.get("mock_inputs", [])
         result = _execute_code(proj["full_solution"], mock_inputs)
@@ -183,44 +376,44 @@ class TestSolutionExecution:
             f"full_solution failed to execute:\n{result['error']}"
         )
 
-    def test_step_outputs_match(self, project_id):
-        proj = self._load(project_id)
-        accumulated_code = ""
-        for step in proj["steps"]:
-            if accumulated_code:
-                accumulated_code += "\n" + step["solution"]
-            else:
-                accumulated_code = step["solution"]
 
-            mock_inputs = step.get("mock_inputs", [])
-            result = _execute_code(accumulated_code, mock_inputs)
+@pytest.mark.parametrize("project_id,step_num", project_step_ids())
+class TestStepOutputs:
+    """Validate each step's accumulated code against its expected output.
 
-            assert result["success"], (
-                f"Step {step['step_num']}: execution failed:\n{result['error']}"
-            )
+    One test per step (rather than per project) so each step reports on its
+    own; a project's steps are executed once, by _step_results.
+    """
 
-            expected = step.get("expected_output", "")
-            if expected:
-                assert _normalize(result["output"]) == _normalize(expected), (
-                    f"Step {step['step_num']}: output mismatch.\n"
-                    f"Expected:\n{repr(expected)}\n"
-                    f"Got:\n{repr(result['output'])}"
-                )
+    def test_step_outputs_match(self, project_id, step_num):
+        step = _cached_load(project_id)["steps"][step_num - 1]
+        result = _step_results(project_id)[step_num - 1]
+        if "skipped" in result:
+            pytest.skip(f"Not run: {result['skipped']}")
+
+        assert result["success"], (
+            f"Step {step['step_num']}: execution failed:\n{result['error']}"
+        )
+
+        expected = step.get("expected_output", "")
+        if expected:
+            assert _outputs_equal(result["output"], expected), (
+                f"Step {step['step_num']}: output mismatch.\n"
+                f"Expected:\n{repr(expected)}\n"
+                f"Got:\n{repr(result['output'])}"
+            )
 
 
 # ---------------------------------------------------------------------------
 # C. Instruction Quality
 # ---------------------------------------------------------------------------
 
-@pytest.mark.parametrize("project_id", project_ids())
+@pytest.mark.parametrize("project_id", _PROJECT_IDS)
 class TestInstructionQuality:
     """Validate that instructions are specific, not vague."""
 
-    def _load(self, project_id):
-        return load_project(DATA_DIR / f"{project_id}.json")
-
     def test_no_vague_instructions(self, project_id):
-        proj = self._load(project_id)
+        proj = _cached_load(project_id)
         for step in proj["steps"]:
             instruction = step["instruction"]
             for pattern in VAGUE_PATTERNS:
@@ -232,21 +425,14 @@ class TestInstructionQuality:
 
     def test_no_apostrophe_in_single_quotes(self, project_id):
         """Solution code should not have apostrophes inside single-quoted strings."""
-        proj = self._load(project_id)
-        # Pattern: single-quoted string containing an apostrophe
-        bad_pattern = re.compile(r"'[^']*(?<=[a-zA-Z])'[a-zA-Z][^']*'")
-        for step in proj["steps"]:
-            solution = step["solution"]
-            # Simpler check: look for common apostrophe problems
-            # e.g., 'Let's', 'don't', 'it's'
-            for match in re.finditer(r"'([^']*)'", solution):
-                content = match.group(1)
-                # If content contains an unescaped apostrophe pattern
-                if re.search(r"[a-zA-Z]'[a-zA-Z]", content):
-                    pytest.fail(
-                        f"Step {step['step_num']}: apostrophe inside single-quoted string: "
-                        f"{match.group()}"
-                    )
+        proj = _cached_load(project_id)
+        # e.g., 'Let's', 'don't', 'it's'
+        for step, (_, strings) in zip(proj["steps"], _scan_steps(project_id)):
+            if strings:
+                pytest.fail(
+                    f"Step {step['step_num']}: apostrophe inside single-quoted string: "
+                    f"{strings[0]}"
+                )
 
 
 # ---------------------------------------------------------------------------
@@ -254,15 +440,12 @@ class TestInstructionQuality:
 # ---------------------------------------------------------------------------
 
 
-@pytest.mark.parametrize("project_id", project_ids())
+@pytest.mark.parametrize("project_id", _PROJECT_IDS)
 class TestConsistencyChecks:
     """Validate internal consistency of project data."""
 
-    def _load(self, project_id):
-        return load_project(DATA_DIR / f"{project_id}.json")
-
     def test_total_lines_approximate(self, project_id):
-        proj = self._load(project_id)
+        proj = _cached_load(project_id)
         sum_expected = sum(s["expected_lines"] for s in proj["steps"])
         total = proj.get("total_lines", sum_expected)
         # Allow ±3 tolerance
@@ -272,16 +455,11 @@ class TestConsistencyChecks:
 
     def test_mock_inputs_coverage(self, project_id):
         """Steps with input() in accumulated code should have enough mock_inputs."""
-        proj = self._load(project_id)
-        accumulated_code = ""
-        for step in proj["steps"]:
-            if accumulated_code:
-                accumulated_code += "\n" + step["solution"]
-            else:
-                accumulated_code = step["solution"]
-
-            # Count input() calls in accumulated code
-            input_count = len(re.findall(r"\binput\s*\(", accumulated_code))
+        proj = _cached_load(project_id)
+        input_count = 0
+        for step, (calls, _) in zip(proj["steps"], _scan_steps(project_id)):
+            # Count input() calls in accumulated code, as a running total
+            input_count += calls
             mock_count = len(step.get("mock_inputs", []))
 
             if input_count > 0:
@@ -292,15 +470,11 @@ class TestConsistencyChecks:
 
     def test_steps_with_input_have_mock_inputs(self, project_id):
         """If a step's solution contains input(), mock_inputs must be non-empty."""
-        proj = self._load(project_id)
-        accumulated_code = ""
-        for step in proj["steps"]:
-            if accumulated_code:
-                accumulated_code += "\n" + step["solution"]
-            else:
-                accumulated_code = step["solution"]
-
-            if re.search(r"\binput\s*\(", accumulated_code):
+        proj = _cached_load(project_id)
+        seen_input = False
+        for step, (calls, _) in zip(proj["steps"], _scan_steps(project_id)):
+            seen_input = seen_input or calls > 0
+            if seen_input:
                 assert len(step.get("mock_inputs", [])) > 0, (
                     f"Step {step['step_num']}: accumulated code has input() but mock_inputs is empty"
                 )
@@ -310,7 +484,7 @@ def test_no_duplicate_project_ids():
     """No two project files should have the same id field."""
     seen_ids = {}
     for path in get_project_files():
-        proj = load_project(path)
+        proj = _cached_load(path.stem)
         pid = proj["id"]
         assert pid not in seen_ids, (
             f"Duplicate project id '{pid}' in {path.name} and {seen_ids[pid]}"
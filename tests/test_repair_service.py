@@ -0,0 +1,110 @@
+"""Tests for recomputing expected outputs in one instrumented run.
+
+_step_outputs_single_run must agree with running each step's accumulated
+code on its own (_step_outputs_per_step), or decline with None so the
+caller falls back to that. Runs go through execute_code, on the host when
+Docker isn't available.
+"""
+
+import pytest
+
+from backend.services.repair_service import (
+    _step_outputs_per_step,
+    _step_outputs_single_run,
+)
+
+
+def _steps(*solutions, mocks=None):
+    return [
+        {
+            "step_num": i + 1,
+            "solution": solution,
+            "mock_inputs": (mocks[i] if mocks else []),
+        }
+        for i, solution in enumerate(solutions)
+    ]
+
+
+AGREEING_CASES = {
+    "plain_prints": _steps("print('a')", "print('b')\nprint('c')", "x = 1\nprint(x)"),
+    "inputs_as_prefixes": _steps(
+        "name = input('Name? ')\nprint('hi', name)",
+        "age = input('Age? ')\nprint(age)",
+        mocks=[["Ada"], ["Ada", "36"]],
+    ),
+    "step_continues_a_class_body": _steps(
+        "class Dog:\n    sound = 'woof'",
+        "    def speak(self):\n        return self.sound",
+        "print(Dog().speak())",
+    ),
+    "step_that_does_not_compile_alone": _steps(
+        "print('start')\nif True:",
+        "    print('inside')",
+        "print('end')",
+    ),
+    "seeded_random": _steps(
+        "import random\nprint(random.randint(1, 100))",
+        "print(random.random())",
+    ),
+    "empty_output_steps": _steps("x = 1", "y = 2", "print(x + y)"),
+}
+
+
+@pytest.mark.parametrize("steps", AGREEING_CASES.values(), ids=AGREEING_CASES.keys())
+def test_single_run_matches_per_step(steps):
+    single = _step_outputs_single_run(steps)
+    assert single is not None
+    assert single == _step_outputs_per_step(steps)
+
+
+def test_step_that_does_not_compile_alone_gets_none():
+    steps = AGREEING_CASES["step_that_does_not_compile_alone"]
+    assert _step_outputs_single_run(steps) == [None, "start\ninside\n", "start\ninside\nend\n"]
+
+
+def test_no_steps():
+    assert _step_outputs_single_run([]) == []
+
+
+DECLINED_CASES = {
+    # Step 1's mocks aren't a prefix of the last step's
+    "mocks_not_a_prefix": _steps(
+        "a = input()\nprint(a)",
+        "b = input()\nprint(b)",
+        mocks=[["x"], ["y", "z"]],
+    ),
+    # Step 1 reads more input than it mocks; alone it would get ''
+    "step_reads_past_its_mocks": _steps(
+        "a = input()\nb = input()\nprint(a, b)",
+        "print('end')",
+        mocks=[["x"], ["x", "y"]],
+    ),
+    # The marker after step 1 sits inside the loop and runs twice
+    "marker_in_a_loop": _steps(
+        "for i in range(2):\n    print(i)",
+        "    print(i * 10)",
+        "print('done')",
+    ),
+    # A marker between try: and the except the next step adds breaks syntax
+    "marker_breaks_syntax": _steps(
+        "print('start')\ntry:\n    x = 1 / 1",
+        "except ZeroDivisionError:\n    x = 0\nprint(x)",
+    ),
+    # Full program fails
+    "run_fails": _steps("print('a')", "raise ValueError('boom')"),
+    # atexit output would follow every per-step run, not just the last
+    "output_after_the_last_step": _steps(
+        "import atexit\natexit.register(print, 'bye')",
+        "print('a')",
+    ),
+}
+
+
+@pytest.mark.parametrize("steps", DECLINED_CASES.values(), ids=DECLINED_CASES.keys())
+def test_single_run_declines_when_it_could_differ(steps):
+    assert _step_outputs_single_run(steps) is None
+
+
+def test_per_step_reports_failed_steps_as_none():
+    steps = _steps("print('a')", "raise ValueError('boom')", "print('c')")
+    assert _step_outputs_per_step(steps) == ["a\n", None, None]
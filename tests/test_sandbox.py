@@ -0,0 +1,30 @@
+"""Sandbox execution tests that run on the host, without Docker."""
+
+import random
+
+import pytest
+
+from backend.config import settings
+from backend.sandbox import pool
+from backend.sandbox.executor import execute_code, execute_code_batch
+
+RANDOM_PROGRAM = "import random\nprint(random.randint(1, 10**6))\n"
+
+
+@pytest.fixture
+def local_pool(monkeypatch):
+    """Start the shared pool on LocalWorkers, even where Docker is available."""
+    monkeypatch.setattr(pool, "_docker_client", lambda: None)
+    monkeypatch.setattr(settings, "sandbox_pool_size", 2)
+    pool.start_pool()
+    assert pool.get_pool() is not None
+    yield pool.get_pool()
+    pool.stop_pool()
+
+
+def test_batch_on_local_pool_is_seeded(local_pool):
+    """Batch-driver children on a local worker see the same seed as the sandbox."""
+    expected = f"{random.Random(42).randint(1, 10**6)}\n"
+    results = execute_code_batch([(RANDOM_PROGRAM, None), (RANDOM_PROGRAM, None)])
+    assert [r["output"] for r in results] == [expected, expected]
+    assert execute_code(RANDOM_PROGRAM)["output"] == expected
@@ -0,0 +1,149 @@
+"""Tests for project JSON decoding and the streamed step parser."""
+
+import pytest
+
+from backend import jsonutil, schema
+from backend.schema import DecodeErrors, decode_project
+from backend.services.claude_service import StepStreamParser, parse_project_response
+
+
+def _project(**overrides) -> dict:
+    project = {
+        "id": "level1_basic_hello",
+        "level_id": 1,
+        "tier": 1,
+        "name": "Hello",
+        "description": "Say hello",
+        "learning_goals": ["print"],
+        "concepts_used": ["print"],
+        "total_lines": 2,
+        "steps": [
+            {"step_num": 1, "instruction": "Print hi", "solution": "print('hi')"},
+            {
+                "step_num": 2,
+                "instruction": "Ask a name",
+                "solution": "name = input('Name? ')",
+                "mock_inputs": ["Ada"],
+            },
+        ],
+        "full_solution": "print('hi')\nname = input('Name? ')",
+    }
+    project.update(overrides)
+    return project
+
+
+@pytest.fixture(params=["msgspec", "fallback"])
+def decoder(request, monkeypatch):
+    """Run each decode test with msgspec and with the jsonutil fallback."""
+    if request.param == "msgspec":
+        if schema._decoder is None:
+            pytest.skip("msgspec not installed")
+    else:
+        monkeypatch.setattr(schema, "_decoder", None)
+        monkeypatch.setattr(
+            schema, "DecodeErrors", (jsonutil.JSONDecodeError, schema.ProjectSchemaError)
+        )
+    return request.param
+
+
+# ---------------------------------------------------------------------------
+# decode_project
+# ---------------------------------------------------------------------------
+
+
+class TestDecodeProject:
+    def test_valid_project_round_trips(self, decoder):
+        project = _project()
+        assert decode_project(jsonutil.dumps(project)) == project
+
+    def test_accepts_bytes(self, decoder):
+        project = _project()
+        assert decode_project(jsonutil.dumps(project).encode()) == project
+
+    @pytest.mark.parametrize("missing", ["id", "steps", "full_solution"])
+    def test_missing_project_key_is_rejected(self, decoder, missing):
+        project = _project()
+        del project[missing]
+        with pytest.raises(schema.DecodeErrors):
+            decode_project(jsonutil.dumps(project))
+
+    def test_missing_step_key_is_rejected(self, decoder):
+        project = _project()
+        del project["steps"][0]["solution"]
+        with pytest.raises(schema.DecodeErrors):
+            decode_project(jsonutil.dumps(project))
+
+    def test_steps_must_be_a_list(self, decoder):
+        with pytest.raises(schema.DecodeErrors):
+            decode_project(jsonutil.dumps(_project(steps={"step_num": 1})))
+
+    def test_malformed_json_is_rejected(self, decoder):
+        with pytest.raises(schema.DecodeErrors):
+            decode_project(jsonutil.dumps(_project())[:-10])
+
+    def test_mistyped_value_is_rejected_by_msgspec(self):
+        if schema._decoder is None:
+            pytest.skip("msgspec not installed")
+        with pytest.raises(DecodeErrors):
+            decode_project(jsonutil.dumps(_project(level_id="one")))
+
+
+def test_parse_project_response_strips_fences():
+    project = _project()
+    text = "```json\n" + jsonutil.dumps(project, indent=True) + "\n```"
+    assert parse_project_response(text) == project
+
+
+def test_parse_project_response_returns_none_on_bad_shape():
+    project = _project()
+    del project["steps"]
+    assert parse_project_response(jsonutil.dumps(project)) is None
+
+
+# ---------------------------------------------------------------------------
+# StepStreamParser
+# ---------------------------------------------------------------------------
+
+
+def _feed_all(parser: StepStreamParser, deltas) -> list[dict]:
+    steps = []
+    for delta in deltas:
+        steps.extend(parser.feed(delta))
+    return steps
+
+
+class TestStepStreamParser:
+    def test_whole_document_at_once(self):
+        project = _project()
+        assert _feed_all(StepStreamParser(), [jsonutil.dumps(project)]) == project["steps"]
+
+    def test_one_character_at_a_time(self):
+        """Keys, braces and strings split across deltas still parse."""
+        project = _project()
+        text = jsonutil.dumps(project, indent=True)
+        assert _feed_all(StepStreamParser(), text) == project["steps"]
+
+    def test_steps_are_returned_as_soon_as_they_close(self):
+        project = _project()
+        text = jsonutil.dumps(project)
+        first_end = text.index("}") + 1
+        parser = StepStreamParser()
+        assert parser.feed(text[:first_end]) == [project["steps"][0]]
+        assert parser.feed(text[first_end:]) == [project["steps"][1]]
+
+    def test_braces_and_quotes_inside_strings(self):
+        steps = [
+            {"step_num": 1, "instruction": 'Print "{x}"', "solution": 'print(f"{x} \\\\ }")'},
+            {"step_num": 2, "instruction": "Close ]", "solution": "d = {'a': [1]}"},
+        ]
+        text = jsonutil.dumps(_project(steps=steps))
+        assert _feed_all(StepStreamParser(), text) == steps
+
+    def test_objects_after_the_steps_array_are_ignored(self):
+        text = '{"steps": [{"step_num": 1}], "extra": {"step_num": 99}}'
+        assert _feed_all(StepStreamParser(), text) == [{"step_num": 1}]
+
+    def test_nothing_before_the_steps_key(self):
+        parser = StepStreamParser()
+        assert parser.feed('{"id": "x", "meta": {"a": 1}, "ste') == []
+        assert parser.feed('ps": [{"step_num": 1}]}') == [{"step_num": 1}]
@@ -0,0 +1,81 @@
+"""Tests for output comparison and feedback in validation_service."""
+
+import random
+from difflib import SequenceMatcher
+
+import pytest
+
+from backend.services.validation_service import (
+    _PARTIAL_RATIO,
+    _RATIO_WINDOW,
+    _generate_feedback,
+    _similarity,
+    validate_output,
+)
+
+
+class TestSimilarity:
+    def test_matches_sequence_matcher_on_short_input(self):
+        a, b = "hello world\nline two", "hello there\nline 2"
+        assert _similarity(a, b) == SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+    def test_partial_match_near_the_length_cutoff_is_scored(self):
+        # Over 5x the length, but the true ratio (0.328) is still above the
+        # "partially correct" threshold, so it must not be skipped
+        a = "abcdefghij"
+        b = a + "Z" * 41
+        expected = SequenceMatcher(None, a, b).ratio()
+        assert expected > _PARTIAL_RATIO
+        assert _similarity(a, b) == pytest.approx(expected)
+
+    def test_skips_only_when_the_threshold_is_unreachable(self):
+        a = "abcdefghij"
+        b = a + "Z" * 60
+        assert 2 * len(a) / (len(a) + len(b)) <= _PARTIAL_RATIO
+        assert _similarity(a, b) == 0.0
+
+    def test_skip_bound_never_hides_a_partial_match(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            shorter = rng.randint(1, 40)
+            longer = rng.randint(shorter, 12 * shorter)
+            a = "".join(rng.choice("ab") for _ in range(shorter))
+            b = a + "".join(rng.choice("ab") for _ in range(longer - shorter))
+            if _similarity(a, b) == 0.0:
+                assert SequenceMatcher(None, a, b, autojunk=False).ratio() <= _PARTIAL_RATIO
+
+    def test_empty_inputs(self):
+        assert _similarity("", "") == 1.0
+        assert _similarity("", "abc") == 0.0
+
+    def test_long_outputs_compare_their_ends(self):
+        middle_a = "x" * (3 * _RATIO_WINDOW)
+        middle_b = "y" * (3 * _RATIO_WINDOW)
+        ends = "same" * (_RATIO_WINDOW // 4)
+        # Only the first and last window are compared, so differing middles
+        # don't count
+        assert _similarity(ends + middle_a + ends, ends + middle_b + ends) == 1.0
+
+
+class TestFeedback:
+    def test_line_count_mismatch_is_reported_first(self):
+        assert "1 fewer line" in _generate_feedback(["a"], ["a", "b"])
+
+    def test_partial_match_near_the_cutoff_gets_partial_hint(self):
+        actual = ["abcdefghij"]
+        expected = ["abcdefghij" + "Z" * 41]
+        assert "partially correct" in _generate_feedback(actual, expected)
+
+    def test_unrelated_output(self):
+        assert "doesn't match" in _generate_feedback(["x"], ["abcdefghijklmnop"])
+
+    def test_almost_there_points_at_the_line(self):
+        hint = _generate_feedback(
+            ["Hello, Ada!", "You are 36"], ["Hello, Ada!", "You are 37"]
+        )
+        assert "line 2" in hint
+
+
+def test_validate_output_tolerates_trailing_whitespace():
+    result = validate_output("a  \nb\n\n", "a\nb")
+    assert result["match"]